@@ -7,6 +7,10 @@ and returned as a list.
 This file can also be imported as a module and contains the following
 functions:
 
+    * _calculate_differences_unsorted - calculate timestamp differences
+    of a pair of pixels in a shifting window, for timestamps that are
+    not sorted.
+
     * calculate_differences - calculate timestamp differences
     for the given pair of pixels. Works only with firmware version
     '2212'. Uses a faster algorithm than the standard version.
@@ -171,6 +175,58 @@ from daplis.functions import utils
 #     return deltas_all
 
 
+def _calculate_differences_unsorted(
+    timestamps_1: ndarray, timestamps_2: ndarray, delta_window: float
+) -> list:
+    """Calculate timestamp differences in a shifting window.
+
+    Walk the timestamps of the first pixel and collect the differences
+    to the timestamps of the second pixel in the window around each of
+    them. Unlike the vectorized search in 'calculate_differences', it
+    does not require the timestamps to be sorted.
+
+    Parameters
+    ----------
+    timestamps_1 : ndarray
+        Timestamps of the first pixel.
+    timestamps_2 : ndarray
+        Timestamps of the second pixel.
+    delta_window : float
+        Width of the time window for counting timestamp differences.
+
+    Returns
+    -------
+    list
+        Timestamp differences for the pair of pixels.
+    """
+    deltas = []
+
+    # Timestamp lag calculation in a shifting window
+    window_start_point = 0
+    n2 = len(timestamps_2)
+    for t_first_pixel in timestamps_1:
+        window_limit_left = t_first_pixel - delta_window
+        window_limit_right = t_first_pixel + delta_window
+
+        # Advance window_start_point
+        while (
+            window_start_point < n2
+            and timestamps_2[window_start_point] < window_limit_left
+        ):
+            window_start_point += 1
+
+        pointer_in_window = window_start_point
+        while (
+            pointer_in_window < n2
+            and timestamps_2[pointer_in_window] <= window_limit_right
+        ):
+            dt = timestamps_2[pointer_in_window] - t_first_pixel
+            deltas.append(dt)
+            pointer_in_window += 1
+
+    return deltas
+
+
 def calculate_differences(
     data: ndarray,
     pixels: List[int] | List[List[int]],
@@ -214,30 +270,42 @@ def calculate_differences(
         for w in pixels_right:
             if w <= q:
                 continue
-            deltas_all[f"{q},{w}"] = []
-
-            # Timestamp lag calculation in a shifting window
-            window_start_point = 0
-            n2 = len(data[f"{w}"])
-            for t_first_pixel in data[f"{q}"]:
-                window_limit_left = t_first_pixel - delta_window
-                window_limit_right = t_first_pixel + delta_window
-
-                # Advance window_start_point
-                while (
-                    window_start_point < n2
-                    and data[f"{w}"][window_start_point] < window_limit_left
-                ):
-                    window_start_point += 1
-
-                pointer_in_window = window_start_point
-                while (
-                    pointer_in_window < n2
-                    and data[f"{w}"][pointer_in_window] <= window_limit_right
-                ):
-                    dt = data[f"{w}"][pointer_in_window] - t_first_pixel
-                    deltas_all[f"{q},{w}"].append(dt)
-                    pointer_in_window += 1
+            timestamps_1 = np.asarray(data[f"{q}"])
+            timestamps_2 = np.asarray(data[f"{w}"])
+
+            # The vectorized search below needs the timestamps of both
+            # pixels sorted, which is not the case if the given cycle
+            # length is shorter than the actual acquisition window
+            if not (
+                np.all(timestamps_1[1:] >= timestamps_1[:-1])
+                and np.all(timestamps_2[1:] >= timestamps_2[:-1])
+            ):
+                deltas_all[f"{q},{w}"] = _calculate_differences_unsorted(
+                    timestamps_1, timestamps_2, delta_window
+                )
+                continue
+
+            # Limits of the window around each timestamp of the first
+            # pixel in the timestamps of the second one
+            window_start = np.searchsorted(
+                timestamps_2, timestamps_1 - delta_window
+            )
+            window_end = np.searchsorted(
+                timestamps_2, timestamps_1 + delta_window, side="right"
+            )
+            in_window = window_end - window_start
+
+            # Indices of all timestamps of the second pixel in each
+            # window, in the same order as the sliding window gives
+            first_in_window = np.repeat(
+                window_start - np.cumsum(in_window) + in_window, in_window
+            )
+            pointer_in_window = np.arange(in_window.sum()) + first_in_window
+
+            deltas_all[f"{q},{w}"] = (
+                timestamps_2[pointer_in_window]
+                - np.repeat(timestamps_1, in_window)
+            ).tolist()
 
     return deltas_all
 
@@ -286,28 +286,19 @@ def plot_shared(
     IndexError
         _description_
     """
-    os.chdir(path)
-
     try:
-        file = glob.glob("*.txt*")[0]
+        file = glob.glob(os.path.join(path, "*.txt*"))[0]
     except IndexError:
         raise IndexError(".txt file not found - check the folder")
 
-    file_name = file[:-4]
+    file_name = os.path.basename(file)[:-4]
 
     data = np.genfromtxt(file, delimiter="")
 
     # Apply mask if requested
     if app_mask is True:
-        path_to_back = os.getcwd()
-        path_to_mask = os.path.realpath(__file__) + "/../.." + "/params/masks"
-        os.chdir(path_to_mask)
-        file_mask = glob.glob(
-            "*{}_{}*".format(daughterboard_number, motherboard_number)
-        )[0]
-        mask = np.genfromtxt(file_mask).astype(int)
+        mask = utils.apply_mask(daughterboard_number, motherboard_number)
         data[mask] = 0
-        os.chdir(path_to_back)
 
     if show_fig is True:
         plt.ion()
@@ -320,13 +311,9 @@ def plot_shared(
     plt.ylabel("Photons (-)")
     plt.plot(data, "o-", color=color)
 
-    try:
-        os.chdir("results/sensor_population")
-    except Exception:
-        os.makedirs("results/sensor_population")
-        os.chdir("results/sensor_population")
-    plt.savefig("{}.png".format(file_name))
-    os.chdir("..")
+    results_dir = os.path.join(path, "results", "sensor_population")
+    os.makedirs(results_dir, exist_ok=True)
+    plt.savefig(os.path.join(results_dir, f"{file_name}.png"))
 
 
 def collect_and_plot_timestamp_differences_shared_feather(
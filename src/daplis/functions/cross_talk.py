@@ -39,7 +39,7 @@ from typing import List
 
 import matplotlib
 import numpy as np
-import pandas as pd
+import pyarrow as pa
 from matplotlib import pyplot as plt
 from pyarrow import feather as ft
 from scipy.optimize import curve_fit
@@ -202,10 +202,12 @@ def _collect_cross_talk(
 
         # If cycle_length is not given manually, estimate from the data
         if cycle_length is None:
-            cycle_length = np.max(data_timestamps * 2500 / 140).astype(int)
+            cycle_length = (
+                np.int64(np.max(data_timestamps)) * 2500 / 140
+            ).astype(int)
 
         # Offset timestamps by cycles (e.g. +4 ms to each next cycle)
-        number_of_cycles = len(data_timestamps.flatten()) / 64 / timestamps
+        number_of_cycles = data_timestamps.size / 64 / timestamps
         offsets = np.repeat(
             np.arange(number_of_cycles, dtype=np.int64) * int(cycle_length),
             timestamps,
@@ -219,7 +221,9 @@ def _collect_cross_talk(
                 tdc, pix = np.argwhere(pixel_coordinates == i)[0]
                 mask = (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
                 ind = np.nonzero(mask)[0]
-                data_cut = data_timestamps[tdc][ind]
+                # Widen the 32-bit timestamps, so the conversion to ps does not
+                # overflow
+                data_cut = data_timestamps[tdc][ind].astype(np.int64)
                 data_cut = data_cut * 2500 / 140
                 data_cut += offsets[mask]
 
@@ -265,7 +269,9 @@ def _collect_cross_talk(
                 tdc, pix = np.argwhere(pixel_coordinates == i)[0]
                 mask = (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
                 ind = np.nonzero(mask)[0]
-                data_cut = data_timestamps[tdc][ind]
+                # Widen the 32-bit timestamps, so the conversion to ps does not
+                # overflow
+                data_cut = data_timestamps[tdc][ind].astype(np.int64)
 
                 if include_offset:
                     data_cut = (
@@ -287,10 +293,25 @@ def _collect_cross_talk(
         )
 
         # Save data as a .feather file in a cycle so data is not lost
-        # in the case of failure close to the end
-        data_for_plot_df = pd.DataFrame.from_dict(deltas_all, orient="index")
+        # in the case of failure close to the end. The table is built
+        # straight from the arrays, padded with nulls to the same length
+        length = max(
+            (len(deltas) for deltas in deltas_all.values()), default=0
+        )
+        data_for_plot = pa.table(
+            {
+                pair: pa.array(
+                    np.pad(
+                        np.asarray(deltas, dtype=float),
+                        (0, length - len(deltas)),
+                        constant_values=np.nan,
+                    ),
+                    from_pandas=True,
+                )
+                for pair, deltas in deltas_all.items()
+            }
+        )
         del deltas_all
-        data_for_plot_df = data_for_plot_df.T
         try:
             os.chdir("cross_talk_data")
         except FileNotFoundError:
@@ -303,17 +324,15 @@ def _collect_cross_talk(
         )
         if os.path.isfile(feather_file):
             # Load existing feather file
-            existing_data = ft.read_feather(feather_file)
+            existing_data = ft.read_table(feather_file)
 
             # Append new data to the existing feather file
-            combined_data = pd.concat(
-                [existing_data, data_for_plot_df], axis=0
-            )
+            combined_data = pa.concat_tables([existing_data, data_for_plot])
             ft.write_feather(combined_data, feather_file)
 
         else:
             # Save as a new feather file
-            ft.write_feather(data_for_plot_df, feather_file)
+            ft.write_feather(data_for_plot, feather_file)
         os.chdir("..")
 
     # Check, if the file was created
@@ -760,9 +779,9 @@ def collect_dcr_by_file(
             timestamps_per_pixel[i] = len(data_timestamps[tdc][ind])
 
         acq_window_length = (
-            np.max(data_timestamps * 2500 / 140).astype(int)
+            (np.int64(np.max(data_timestamps)) * 2500 / 140).astype(int)
         ) * 1e-12
-        number_of_cycles = len(data_timestamps.flatten()) / 64 / timestamps
+        number_of_cycles = data_timestamps.size / 64 / timestamps
 
         dcr.append(timestamps_per_pixel / acq_window_length / number_of_cycles)
 
@@ -1351,8 +1370,8 @@ def zero_to_cross_talk_plot(
     Raises
     ------
     FileNotFoundError
-        Raised when no txt file with the sensor population data is
-        found.
+        Raised when no npy or txt file with the sensor population data
+        is found.
     """
 
     print("\n> > > Plotting cross-talk peaks and averages < < <\n")
@@ -1370,11 +1389,17 @@ def zero_to_cross_talk_plot(
     ]
     try:
         os.chdir(os.path.join(path, "senpop_data"))
-        senpop_data_txt = glob.glob("*.txt")[0]
-        senpop = np.genfromtxt(senpop_data_txt)
+        # Sensor population is saved in binary by default, txt files are
+        # from older collections
+        senpop_data_npy = glob.glob("*.npy")
+        if senpop_data_npy:
+            senpop = np.load(senpop_data_npy[0]).astype(np.float64)
+        else:
+            senpop_data_txt = glob.glob("*.txt")[0]
+            senpop = np.genfromtxt(senpop_data_txt)
     except Exception as _:
         raise FileNotFoundError(
-            "Txt file with sensor population data is not found. Collect "
+            "File with sensor population data is not found. Collect "
             "sensor population first."
         )
 
@@ -9,6 +9,9 @@ functions:
     * _flatten - flatten the input list into a single list of numbers.
     The input list could contain any number of lists of numbers.
 
+    * _read_pixel_pairs - read timestamp differences of the given
+    pixel pairs from a '.feather' file.
+
     * _combine_intermediate_feather_files - combine '.feather' files
     into one. Used for combining the intermediate steps of saving
     the timestamp differences into a single file.
@@ -59,6 +62,7 @@ from typing import List
 
 import numpy as np
 import pandas as pd
+import pyarrow as pa
 from matplotlib import pyplot as plt
 from pyarrow import feather as ft
 from tqdm import tqdm
@@ -96,6 +100,45 @@ def _flatten(input_list: List):
     return flattened
 
 
+def _read_pixel_pairs(feather_file: str, pixels: List[int]) -> dict:
+    """Read timestamp differences of the given pixel pairs.
+
+    The file is memory-mapped and opened once; only the columns of the
+    requested pairs that are present in it are read.
+
+    Parameters
+    ----------
+    feather_file : str
+        Path to the '.feather' file with timestamp differences.
+    pixels : List[int]
+        List of pixel numbers; all pairs of these pixels are read.
+
+    Returns
+    -------
+    dict
+        Dictionary with the pair names ("{pixel1},{pixel2}") as keys and
+        arrays of timestamp differences without NaNs as values. Pairs
+        missing in the file are not included.
+    """
+    with pa.memory_map(feather_file) as source:
+        available = set(pa.ipc.open_file(source).schema.names)
+    pairs = [
+        f"{pixel1},{pixel2}"
+        for i, pixel1 in enumerate(pixels)
+        for pixel2 in pixels[i + 1 :]
+    ]
+    columns = [pair for pair in pairs if pair in available]
+
+    table = ft.read_table(feather_file, columns=columns, memory_map=True)
+
+    deltas = {}
+    for pair in columns:
+        data = table.column(pair).to_numpy()
+        deltas[pair] = data[~np.isnan(data)]
+
+    return deltas
+
+
 def _combine_intermediate_feather_files(path: str, skip_data: bool = False):
     """Combine intermediate '.feather' files into one.
 
@@ -144,15 +187,18 @@ def _combine_intermediate_feather_files(path: str, skip_data: bool = False):
 
     feather_files = glob.glob(file_pattern)
 
-    data_combined = []
-    data_combined = pd.DataFrame(data_combined)
-
-    for ft_file in feather_files:
-        data = ft.read_feather(ft_file)
-
-        data_combined = pd.concat([data_combined, data], ignore_index=True)
-
-        data_combined.to_feather(f"{combined_feather_file_name}.feather")
+    # Concatenate all files at once and write the result a single time,
+    # in large record batches
+    if feather_files:
+        data_combined = pd.concat(
+            [ft.read_feather(ft_file) for ft_file in feather_files],
+            ignore_index=True,
+        )
+        ft.write_feather(
+            data_combined,
+            f"{combined_feather_file_name}.feather",
+            chunksize=65536,
+        )
 
     for ft_file in feather_files:
         os.remove(ft_file)
@@ -521,12 +567,14 @@ def calculate_and_save_timestamp_differences(
 
     # Mask the hot/warm pixels
     if apply_mask is True:
-        mask = utils.apply_mask(daughterboard_number, motherboard_number)
+        hot_pixels = utils.hot_pixel_mask(
+            daughterboard_number, motherboard_number
+        )
         if isinstance(pixels[0], int) and isinstance(pixels[1], int):
-            pixels = [pix for pix in pixels if pix not in mask]
+            pixels = np.asarray(pixels)[~hot_pixels[pixels]].tolist()
         else:
-            pixels[0] = [pix for pix in pixels[0] if pix not in mask]
-            pixels[1] = [pix for pix in pixels[1] if pix not in mask]
+            pixels[0] = np.asarray(pixels[0])[~hot_pixels[pixels[0]]].tolist()
+            pixels[1] = np.asarray(pixels[1])[~hot_pixels[pixels[1]]].tolist()
 
     for i in tqdm(range(ceil(len(files_all))), desc="Collecting data"):
         file = files_all[i]
@@ -555,10 +603,12 @@ def calculate_and_save_timestamp_differences(
 
         # If cycle_length is not given manually, estimate from the data
         if cycle_length is None:
-            cycle_length = np.max(data_timestamps * 2500 / 140).astype(int)
+            cycle_length = (
+                np.int64(np.max(data_timestamps)) * 2500 / 140
+            ).astype(int)
 
         # Offset timestamps by cycles (e.g. +4 ms to each next cycle)
-        number_of_cycles = len(data_timestamps.flatten()) / 64 / timestamps
+        number_of_cycles = data_timestamps.size / 64 / timestamps
         offsets = np.repeat(
             np.arange(number_of_cycles, dtype=np.int64) * int(cycle_length),
             timestamps,
@@ -573,7 +623,9 @@ def calculate_and_save_timestamp_differences(
                 tdc, pix = np.argwhere(pixel_coordinates == i)[0]
                 mask = (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
                 ind = np.nonzero(mask)[0]
-                data_cut = data_timestamps[tdc][ind]
+                # Widen the 32-bit timestamps, so the conversion to ps does not
+                # overflow
+                data_cut = data_timestamps[tdc][ind].astype(np.int64)
                 data_cut = data_cut * 2500 / 140
                 data_cut += offsets[mask]
 
@@ -619,7 +671,9 @@ def calculate_and_save_timestamp_differences(
                 tdc, pix = np.argwhere(pixel_coordinates == i)[0]
                 mask = (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
                 ind = np.nonzero(mask)[0]
-                data_cut = data_timestamps[tdc][ind]
+                # Widen the 32-bit timestamps, so the conversion to ps does not
+                # overflow
+                data_cut = data_timestamps[tdc][ind].astype(np.int64)
 
                 if include_offset:
                     data_cut = (
@@ -1814,32 +1868,28 @@ def collect_and_plot_timestamp_differences(
     if same_y is True:
         y_max_all = 0
 
+    # Read the data of all requested pairs from the Feather file at once
+    if ft_file is not None:
+        deltas = _read_pixel_pairs(ft_file, pixels)
+    else:
+        deltas = _read_pixel_pairs(
+            f"delta_ts_data/{feather_file_name}.feather", pixels
+        )
+
     for q, _ in tqdm(enumerate(pixels), desc="Row in plot"):
         for w, _ in enumerate(pixels):
             if w <= q:
                 continue
+            try:
+                data_to_plot = deltas[f"{pixels[q]},{pixels[w]}"]
+            except KeyError:
+                continue
+
+            # Only the subplots of the pairs with data are shown
             if len(pixels) > 2:
                 axs[q][w - 1].axes.set_axis_on()
 
-            # Read data from Feather file
-            if ft_file is not None:
-                try:
-                    data_to_plot = ft.read_feather(
-                        ft_file, columns=[f"{pixels[q]},{pixels[w]}"]
-                    ).dropna()
-                except ValueError:
-                    continue
-            else:
-                try:
-                    data_to_plot = ft.read_feather(
-                        f"delta_ts_data/{feather_file_name}.feather",
-                        columns=[f"{pixels[q]},{pixels[w]}"],
-                    ).dropna()
-                except ValueError:
-                    continue
-
             # Prepare the data for the plot
-            data_to_plot = np.array(data_to_plot)
             data_to_plot = np.delete(
                 data_to_plot, np.argwhere(data_to_plot < range_left)
             )
@@ -1939,24 +1989,17 @@ def collect_and_plot_timestamp_differences(
 
                 plt.title(f"Pixels {pixels[q]},{pixels[w]}")
 
-            # Save the figure
-            try:
-                os.chdir("results/delta_t")
-            except FileNotFoundError:
-                os.makedirs("results/delta_t")
-                os.chdir("results/delta_t")
-            fig.tight_layout()  # for perfect spacing between the plots
-            plt.savefig(f"{feather_file_name}_delta_t_grid.png")
-
-            os.chdir(path)
-
-    # Pickle the figure if requested
+    # Save the figure once all pairs are plotted; rendering the whole
+    # grid after each pair is what takes most of the time
     try:
         os.chdir("results/delta_t")
     except FileNotFoundError:
         os.makedirs("results/delta_t")
         os.chdir("results/delta_t")
+    fig.tight_layout()  # for perfect spacing between the plots
+    plt.savefig(f"{feather_file_name}_delta_t_grid.png")
 
+    # Pickle the figure if requested
     if pickle_figure:
         with open(f"{feather_file_name}_delta_t_grid.pkl", "wb") as f:
             pickle.dump(fig, f)
@@ -2213,17 +2256,15 @@ def collect_and_plot_timestamp_differences_full_sensor(
 
                 plt.title(f"Pixels {pixels[0]},{256 + 255 - pixels[1]}")
 
-            # Save the figure
-            try:
-                os.chdir("results/delta_t")
-            except FileNotFoundError:
-                os.makedirs("results/delta_t")
-                os.chdir("results/delta_t")
-            fig.tight_layout()  # for perfect spacing between the plots
-            plt.savefig(
-                "{name}_delta_t_grid.png".format(name=feather_file_name)
-            )
-            os.chdir("../..")
+    # Save the figure once all pairs are plotted
+    try:
+        os.chdir("results/delta_t")
+    except FileNotFoundError:
+        os.makedirs("results/delta_t")
+        os.chdir("results/delta_t")
+    fig.tight_layout()  # for perfect spacing between the plots
+    plt.savefig("{name}_delta_t_grid.png".format(name=feather_file_name))
+    os.chdir("../..")
 
     print(
         "\n> > > Plot is saved as {file} in {path}< < <".format(
@@ -3,6 +3,12 @@
 This file can also be imported as a module and contains the following
 functions:
 
+    * _interpolate_gaussian - evaluate a fitted Gaussian on a finer
+    grid for plotting.
+
+    * _fit_pair_with_gaussian - histogram and fit timestamp
+    differences of a pair of pixels, caching the result.
+
     * fit_with_gaussian - fit timestamp differences of a pair of pixels
     with a Gaussian function and plot a histogram of timestamp
     differences and the fit in a single figure.
@@ -33,6 +39,7 @@ functions:
 
 from __future__ import annotations
 
+import functools
 import glob
 import os
 import pickle
@@ -51,6 +58,147 @@ from scipy import signal as sg
 from daplis.functions import utils
 
 
+def _interpolate_gaussian(
+    bin_centers: np.ndarray,
+    amp: float,
+    mu: float,
+    sigma: float,
+    bkg: float,
+    points_per_bin: int = 100,
+) -> tuple[np.ndarray, np.ndarray]:
+    """Evaluate a fitted Gaussian on a finer grid for plotting.
+
+    Parameters
+    ----------
+    bin_centers : np.ndarray
+        Centers of the histogram bins used for the fit.
+    amp : float
+        Amplitude of the Gaussian.
+    mu : float
+        Mean (center) of the Gaussian.
+    sigma : float
+        Standard deviation of the Gaussian.
+    bkg : float
+        Background offset.
+    points_per_bin : int, optional
+        Number of points of the grid per histogram bin. The default
+        is 100.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray]
+        Points of the finer grid and the Gaussian values in them.
+    """
+    x = np.linspace(
+        np.min(bin_centers),
+        np.max(bin_centers),
+        len(bin_centers) * points_per_bin,
+    )
+
+    return x, utils.gaussian(x, amp, mu, sigma, bkg)
+
+
+@functools.lru_cache(maxsize=32)
+def _fit_pair_with_gaussian(
+    feather_file: str,
+    mtime_ns: int,
+    pix_left: int,
+    pix_right: int,
+    range_left: float,
+    range_right: float,
+    multiplier: int,
+    normalize: bool,
+    file_offset_abs: str | None,
+    offset_mtime_ns: int | None,
+) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] | None:
+    """Histogram and fit timestamp differences of a pair of pixels.
+
+    Numerical part of 'fit_with_gaussian'. The result is cached, so
+    repeated calls with the same data and parameters (e.g., to change
+    only the look of the plot or to pickle it) skip the fit. The
+    modification times of the '.feather' file and of the offset
+    calibration file are part of the cache key, so recalculated
+    timestamp differences or offsets are fitted anew.
+
+    Parameters
+    ----------
+    feather_file : str
+        Absolute path to the '.feather' file with timestamp differences.
+    mtime_ns : int
+        Modification time of the '.feather' file, in nanoseconds.
+    pix_left : int
+        First pixel of the pair.
+    pix_right : int
+        Second pixel of the pair.
+    range_left : float
+        Left limit for the signal window.
+    range_right : float
+        Right limit for the signal window.
+    multiplier : int
+        Multiplier of 17.857 ps for the histogram bin size.
+    normalize : bool
+        Switch for normalizing the histogram to median.
+    file_offset_abs : str | None
+        Absolute path to the '.npy' file with the offset calibration
+        for the particular board, None for no offset calibration.
+    offset_mtime_ns : int | None
+        Modification time of the offset calibration file, in
+        nanoseconds.
+
+    Returns
+    -------
+    tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray] | None
+        Read-only bin edges, histogram counts, optimal parameters of
+        the Gaussian and their covariance; None if there are no data
+        for the pair.
+    """
+    try:
+        data_to_plot = (
+            ft.read_table(feather_file, columns=[f"{pix_left},{pix_right}"])
+            .column(0)
+            .to_numpy(zero_copy_only=False)
+        )
+    except (ValueError, KeyError):
+        return None
+    data_to_plot = data_to_plot[~np.isnan(data_to_plot)]
+    # Check if there any finite values
+    if not len(data_to_plot):
+        return None
+
+    # Use the given window for trimming the data for fitting
+    data_to_plot = data_to_plot[
+        (data_to_plot >= range_left) & (data_to_plot <= range_right)
+    ]
+
+    if file_offset_abs is not None:
+        data_offset = np.load(file_offset_abs)
+        delay_pix1 = data_offset[pix_left]
+        delay_pix2 = data_offset[pix_right]
+        data_to_plot = data_to_plot - delay_pix1 + delay_pix2
+
+    # Bins must be in units of 17.857 ps (2500/140)
+    bins = np.arange(
+        np.min(data_to_plot),
+        np.max(data_to_plot),
+        2500 / 140 * multiplier,
+    )
+
+    n, b = np.histogram(data_to_plot, bins)
+
+    if normalize:
+        n = n / np.median(n)
+
+    bin_centers = (b - 2500 / 140 * multiplier / 2)[1:]
+
+    par, pcov = utils.fit_gaussian(bin_centers, n)
+
+    # The arrays are shared between the calls
+    for array in (b, n, par, pcov):
+        array.flags.writeable = False
+
+    return b, n, par, pcov
+
+
 def fit_with_gaussian(
     path: str,
     pixels: List[int] | List[List[int]],
@@ -111,7 +259,10 @@ def fit_with_gaussian(
         The default is False.
     pickle_figure : bool, optional
         Switch for pickling the plot. Can be used to extract the plot
-        data. The default is False.
+        data. Next to the '.pkl' file, the histogram and the fit
+        parameters are saved to a compressed '.npz' file with arrays
+        "x", "y", "popt" and "pcov", which can be loaded without
+        matplotlib. The default is False.
     file_offset_abs : str, optional
         Absolute path to the '.npy' file with the offset calibration
         for the particular board. The default is None.
@@ -167,86 +318,47 @@ def fit_with_gaussian(
     if return_fit_params:
         fit_params = {}
 
-    data = ft.read_feather(f"{feather_file_name}")
+    # The fits are cached by the files and their modification times, so
+    # the absolute paths are needed
+    feather_file = os.path.abspath(feather_file_name)
+    feather_mtime_ns = os.stat(feather_file).st_mtime_ns
+    offset_mtime_ns = None
+    if file_offset_abs is not None:
+        file_offset_abs = os.path.abspath(file_offset_abs)
+        try:
+            offset_mtime_ns = os.stat(file_offset_abs).st_mtime_ns
+        except FileNotFoundError:
+            print(
+                "No absolute path to the '.npy' file with "
+                "the offset calibration data was provided. Offset "
+                "calibration is not applied."
+            )
+            file_offset_abs = None
 
     for pix_left in pixels_left:
         for pix_right in pixels_right:
-            try:
-                data_to_plot = data[f"{pix_left},{pix_right}"].dropna()
-            except (ValueError, KeyError):
+            fit_result = _fit_pair_with_gaussian(
+                feather_file,
+                feather_mtime_ns,
+                pix_left,
+                pix_right,
+                range_left,
+                range_right,
+                multiplier,
+                normalize,
+                file_offset_abs,
+                offset_mtime_ns,
+            )
+            if fit_result is None:
                 print(f"No data for {pix_left},{pix_right}")
                 continue
-            # Check if there any finite values
-            if not np.any(~np.isnan(data_to_plot)):
-                print(f"No data for {pixels_left},{pixels_right}")
-                continue
-
-            data_to_plot = data_to_plot.dropna()
-            data_to_plot = np.array(data_to_plot)
-
-            # Use the given window for trimming the data for fitting
-            data_to_plot = np.delete(
-                data_to_plot, np.argwhere(data_to_plot < range_left)
-            )
-            data_to_plot = np.delete(
-                data_to_plot, np.argwhere(data_to_plot > range_right)
-            )
 
             os.chdir(path)
 
-            # Bins must be in units of 17.857 ps (2500/140)
-            bins = np.arange(
-                np.min(data_to_plot),
-                np.max(data_to_plot),
-                2500 / 140 * multiplier * 2,
-            )
-
-            # Calculate histogram of timestamp differences for primary guess
-            # of fit parameters and selecting a narrower window for the fit
-            n, b = np.histogram(data_to_plot, bins)
-
-            try:
-                n_argmax = np.argmax(n)
-            except ValueError:
-                print("Couldn't find position of histogram max")
-
-            if file_offset_abs is not None:
-                try:
-                    data_offset = np.load(file_offset_abs)
-                    delay_pix1 = data_offset[pix_left]
-                    delay_pix2 = data_offset[pix_right]
-                    data_to_plot = data_to_plot - delay_pix1 + delay_pix2
-                except FileNotFoundError:
-                    print(
-                        "No absolute path to the '.npy' file with "
-                        "the offset calibration data was provided. Offset "
-                        "calibration is not applied."
-                    )
-                    pass
-
-            # Bins must be in units of 17.857 ps (2500/140)
-            bins = np.arange(
-                np.min(data_to_plot),
-                np.max(data_to_plot),
-                2500 / 140 * multiplier,
-            )
-
-            n, b = np.histogram(data_to_plot, bins)
-
-            if normalize:
-                n = n / np.median(n)
-
+            b, n, par, pcov = fit_result
             bin_centers = (b - 2500 / 140 * multiplier / 2)[1:]
-
-            par, pcov = utils.fit_gaussian(bin_centers, n)
-
             # Interpolate for smoother fit plot
-            to_fit_b = np.linspace(
-                np.min(bin_centers),
-                np.max(bin_centers),
-                len(bin_centers) * 100,
-            )
-            to_fit_n = utils.gaussian(to_fit_b, par[0], par[1], par[2], par[3])
+            to_fit_b, to_fit_n = _interpolate_gaussian(bin_centers, *par)
 
             perr = np.sqrt(np.diag(pcov))
             contrast = par[0] / par[3] * 100
@@ -332,6 +444,17 @@ def fit_with_gaussian(
                 ) as f:
                     pickle.dump(fig, f)
 
+                # Save the plotted histogram and the fit parameters as
+                # well, which are much smaller than the figure and do
+                # not depend on the matplotlib version
+                np.savez_compressed(
+                    f"{file_name}_pixels_{pix_left},{pix_right}_fit.npz",
+                    x=b[1:],
+                    y=n,
+                    popt=par,
+                    pcov=pcov,
+                )
+
             os.chdir("../..")
 
     return fit_params if return_fit_params else None
@@ -539,12 +662,7 @@ def fit_with_gaussian_combine(
     par, pcov = utils.fit_gaussian(bin_centers, n)
 
     # Interpolate for smoother fit plot
-    to_fit_b = np.linspace(
-        np.min(bin_centers),
-        np.max(bin_centers),
-        len(bin_centers) * 100,
-    )
-    to_fit_n = utils.gaussian(to_fit_b, par[0], par[1], par[2], par[3])
+    to_fit_b, to_fit_n = _interpolate_gaussian(bin_centers, *par)
 
     perr = np.sqrt(np.diag(pcov))
     contrast = par[0] / par[3] * 100
@@ -1124,10 +1242,7 @@ def fit_with_gaussian_full_sensor(
     par, pcov = utils.fit_gaussian(bin_centers, n)
 
     # Interpolate for smoother fit plot
-    to_fit_b = np.linspace(
-        np.min(bin_centers), np.max(bin_centers), len(bin_centers) * 100
-    )
-    to_fit_n = utils.gaussian(to_fit_b, par[0], par[1], par[2], par[3])
+    to_fit_b, to_fit_n = _interpolate_gaussian(bin_centers, *par)
 
     perr = np.sqrt(np.diag(pcov))
     contrast = par[0] / par[3] * 100
@@ -1396,13 +1511,8 @@ def fit_with_gaussian_fancy(
 
             # For smoother fit
             if interpolate_fit:
-                fit_bins_plot = np.linspace(
-                    np.min(bin_centers),
-                    np.max(bin_centers),
-                    len(bin_centers) * 100,
-                )
-                fit_counts_plot = utils.gaussian(
-                    fit_bins_plot,
+                fit_bins_plot, fit_counts_plot = _interpolate_gaussian(
+                    bin_centers,
                     result.params["height"].value,
                     result.params["center"].value,
                     result.params["sigma"].value,
@@ -7,36 +7,77 @@ LinoSPAD2 data output.
 This file can also be imported as a module and contains the following
 functions:
 
+    * _build_pixel_layout - Precompute pixel lookup tables for a
+    firmware version.
+
+    * _get_pixel_layout - Return the pixel lookup tables for a firmware
+    version.
+
+    * _list_data_files_by_mtime - List '.dat' files in the folder sorted
+    by modification time.
+
+    * _find_motherboard_folder - Find the data folder of the given
+    motherboard.
+
+    * _count_timestamps_per_pixel - Count valid timestamps in each
+    pixel for a single data file.
+
+    * _count_raw_timestamps - Count valid timestamps per pixel straight
+    from the binary words of a data file.
+
+    * _remap_pix_address - Fix pixel addressing of a sensor half.
+
+    * _median - Median of a 1D array through partial sorting.
+
+    * _mask_nonpositive - Replace nonpositive values with NaN for
+    plotting on a log scale.
+
+    * _write_bytes - Write bytes to a file.
+
+    * _unpack_and_count - Unpack a single data file and count valid
+    timestamps per pixel.
+
+    * _unpack_and_count_cached - Unpack a single data file and count
+    valid timestamps per pixel, caching the result.
+
     * collect_data_and_apply_mask - Collect data from files and apply
     mask to the valid pixel count.
 
+    * _collect_data_cached - Collect the sensor population, reusing a
+    cached result.
+
     * plot_single_pix_hist - Plot a histogram for each pixel in the given
     range.
 
     * plot_sensor_population - Plot number of timestamps in each pixel
     for all data files.
 
-    * plot_sensor_population_rates - Plot photon rate in each pixel
-    for all data files.
-
     * plot_sensor_population_spdc - Plot sensor population for SPDC data.
 
     * plot_sensor_population_full_sensor - Plot the number of timestamps
     in each pixel for all data files from two different FPGAs/sensor
     halves.
+
+    * _load_figure - Load a pickled figure.
+
+    * unpickle_plot - Unpickle a saved figure and return plot data.
 """
 
 from __future__ import annotations
 
-import glob
+import fnmatch
+import functools
+import hashlib
 import os
 import pickle
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from typing import List
 
 import numpy as np
 from matplotlib import pyplot as plt
 from matplotlib.lines import Line2D
+from scipy import signal as sg
 from scipy.optimize import curve_fit
 from scipy.signal import find_peaks
 from tqdm import tqdm
@@ -44,6 +85,448 @@ from tqdm import tqdm
 from daplis.functions import unpack as f_up
 from daplis.functions import utils
 
+# Version of the cached sensor populations in 'results/.cache'; bump it
+# whenever the collection or the cache format changes, so that stale
+# populations are not reused
+_CACHE_VERSION = 1
+
+
+def _build_pixel_layout(pixel_coordinates: np.ndarray) -> dict:
+    """Precompute pixel lookup tables for a firmware version.
+
+    Parameters
+    ----------
+    pixel_coordinates : np.ndarray
+        Matrix of pixel coordinates, where rows are numbers of TDCs
+        and columns are the pixels connected to these TDCs.
+
+    Returns
+    -------
+    dict
+        Dictionary with the matrix of pixel coordinates ("coord") and,
+        for each of the 256 pixels, the number of the TDC it is
+        connected to ("tdc_of_pix") and its position in that TDC
+        ("col_of_pix"). The arrays are read-only.
+    """
+    pixel_coordinates = np.ascontiguousarray(pixel_coordinates, np.int16)
+    tdcs, cols = np.indices(pixel_coordinates.shape, dtype=np.int16)
+
+    tdc_of_pix = np.empty(256, dtype=np.int16)
+    col_of_pix = np.empty(256, dtype=np.int16)
+    tdc_of_pix[pixel_coordinates] = tdcs
+    col_of_pix[pixel_coordinates] = cols
+
+    # The tables are shared by reference between the unpacking threads;
+    # make sure none of them modifies them in place
+    for table in (pixel_coordinates, tdc_of_pix, col_of_pix):
+        table.flags.writeable = False
+
+    return {
+        "coord": pixel_coordinates,
+        "tdc_of_pix": tdc_of_pix,
+        "col_of_pix": col_of_pix,
+    }
+
+
+# Pixel lookup tables for the recognized firmware versions: in '2212s'
+# (skip) each TDC is connected to every 64th pixel, in '2212b' (block)
+# to 4 neighboring pixels
+_LAYOUTS = {
+    "2212s": _build_pixel_layout(np.arange(256).reshape(4, 64).T),
+    "2212b": _build_pixel_layout(np.arange(256).reshape(64, 4)),
+}
+
+
+def _get_pixel_layout(firmware_version: str) -> dict:
+    """Return the pixel lookup tables for a firmware version.
+
+    The tables are built once on import and shared by all calls.
+
+    Parameters
+    ----------
+    firmware_version : str
+        LinoSPAD2 firmware version.
+
+    Returns
+    -------
+    dict
+        Pixel lookup tables, see '_build_pixel_layout'.
+    """
+    if firmware_version not in _LAYOUTS:
+        print("\nFirmware version is not recognized.")
+        sys.exit()
+
+    return _LAYOUTS[firmware_version]
+
+
+def _list_data_files_by_mtime(path: str) -> List[str]:
+    """List '.dat' files in the folder sorted by modification time.
+
+    The modification times are taken from the directory entries, which
+    cache their 'stat' result (on Windows it comes with the directory
+    listing itself).
+
+    Parameters
+    ----------
+    path : str
+        Path to the folder with the '.dat' data files.
+
+    Returns
+    -------
+    List[str]
+        Absolute paths to the data files, oldest first.
+    """
+    with os.scandir(os.path.abspath(path)) as entries:
+        data_files = [
+            entry
+            for entry in entries
+            if entry.is_file() and fnmatch.fnmatch(entry.name, "*.dat*")
+        ]
+    data_files.sort(key=lambda entry: entry.stat().st_mtime)
+
+    return [entry.path for entry in data_files]
+
+
+def _find_motherboard_folder(path: str, motherboard_number: str) -> str:
+    """Find the data folder of the given motherboard.
+
+    The directory is scanned only until the first folder with the
+    motherboard number in its name.
+
+    Parameters
+    ----------
+    path : str
+        Path to the folder with the data folders of both motherboards.
+    motherboard_number : str
+        Motherboard number that is part of the folder name.
+
+    Returns
+    -------
+    str
+        Path to the first matching folder.
+
+    Raises
+    ------
+    FileNotFoundError
+        If there is no folder with the motherboard number in its name.
+    """
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir() and motherboard_number in entry.name:
+                return entry.path
+
+    raise FileNotFoundError(
+        f"No folder for motherboard '{motherboard_number}' in {path}"
+    )
+
+
+def _count_timestamps_per_pixel(
+    data_pixels: np.ndarray,
+    data_timestamps: np.ndarray,
+    layout: dict,
+) -> np.ndarray:
+    """Count valid timestamps in each pixel for a single data file.
+
+    Parameters
+    ----------
+    data_pixels : np.ndarray
+        2D array of pixel coordinates in the TDC, as returned by the
+        unpacking functions.
+    data_timestamps : np.ndarray
+        2D array of timestamps, as returned by the unpacking functions.
+    layout : dict
+        Pixel lookup tables for the firmware version used, see
+        '_build_pixel_layout'.
+
+    Returns
+    -------
+    np.ndarray
+        Number of valid timestamps in each of the 256 pixels.
+    """
+    timestamps_per_pixel = np.zeros(256, dtype=np.uint32)
+    coord = layout["coord"]
+    valid = data_timestamps >= 0
+
+    # Count the valid timestamps per pixel coordinate in each TDC and
+    # scatter the few counts to the pixel numbers, instead of mapping
+    # every timestamp to its pixel number
+    for tdc in range(len(data_pixels)):
+        timestamps_per_pixel[coord[tdc]] = np.bincount(
+            data_pixels[tdc][valid[tdc]], minlength=coord.shape[1]
+        )
+
+    return timestamps_per_pixel
+
+
+def _count_raw_timestamps(
+    file: str,
+    timestamps: int,
+    layout: dict,
+) -> tuple[np.ndarray, int, int]:
+    """Count valid timestamps per pixel straight from the binary words.
+
+    Counting needs only the validity bit and the pixel address of each
+    word, so instead of unpacking the timestamps first, only the
+    compact 8-bit pixel codes are decoded (see
+    'unpack._decode_pixel_codes') and counted per TDC.
+
+    Parameters
+    ----------
+    file : str
+        Path to the data file.
+    timestamps : int
+        Number of timestamps per pixel per acquisition cycle.
+    layout : dict
+        Pixel lookup tables for the firmware version used, see
+        '_build_pixel_layout'.
+
+    Returns
+    -------
+    tuple[np.ndarray, int, int]
+        Number of valid timestamps in each of the 256 pixels, the
+        largest valid timestamp (-1 if there are none) and the total
+        number of timestamps in the file.
+
+    Raises
+    ------
+    ValueError
+        If the file does not hold a whole number of acquisition cycles.
+    """
+    raw_data = f_up._read_raw_data(file)
+    cycles = len(raw_data) // (timestamps * 65)
+    # Cycles by TDCs by timestamps; the 65th TDC does not hold any
+    # actual data. As in 'unpack.unpack_binary_data', a file that ends
+    # with a partial cycle raises a ValueError
+    raw_data = np.asarray(raw_data).reshape(cycles, 65, timestamps)[:, :-1]
+
+    # Valid timestamps of the pixels 0-3 in the TDC have the codes 8-11
+    pixel_codes = f_up._decode_pixel_codes(raw_data)
+    counts_per_tdc = np.empty(layout["coord"].shape, dtype=np.uint32)
+    for pix in range(counts_per_tdc.shape[1]):
+        counts_per_tdc[:, pix] = np.count_nonzero(
+            pixel_codes == 0b1000 + pix, axis=(0, 2)
+        )
+    timestamps_per_pixel = np.empty(256, dtype=np.uint32)
+    timestamps_per_pixel[layout["coord"]] = counts_per_tdc
+
+    max_timestamp = f_up._max_valid_timestamp(raw_data)
+
+    return timestamps_per_pixel, max_timestamp, raw_data.size
+
+
+def _remap_pix_address(
+    timestamps_per_pixel: np.ndarray, out: np.ndarray | None = None
+) -> np.ndarray:
+    """Fix pixel addressing of a sensor half.
+
+    The two quarters of the sensor half are swapped and the pixel order
+    in the first one is reversed, in a single pass over the data.
+
+    Parameters
+    ----------
+    timestamps_per_pixel : np.ndarray
+        Values for each of the 256 pixels with the incorrect addressing.
+    out : np.ndarray, optional
+        Array of 256 elements to write the result to, must not overlap
+        with the input. A new array is allocated if not given.
+
+    Returns
+    -------
+    np.ndarray
+        Values for each of the 256 pixels with the correct addressing.
+    """
+    if out is None:
+        out = np.empty_like(timestamps_per_pixel)
+    out[:128] = timestamps_per_pixel[128:]
+    out[128:] = timestamps_per_pixel[127::-1]
+
+    return out
+
+
+def _median(data: np.ndarray) -> float:
+    """Median of a 1D array through partial sorting.
+
+    Gives the same result as `np.median`, but selects only the middle
+    element(s) with `np.partition` instead of sorting the whole array.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        1D array of values.
+
+    Returns
+    -------
+    float
+        Median of the data.
+    """
+    middle = len(data) // 2
+    if len(data) % 2:
+        return np.partition(data, middle)[middle]
+
+    # Averaged as floats, as summing the two integers could overflow
+    partitioned = np.partition(data, (middle - 1, middle))
+    return partitioned[middle - 1 : middle + 1].mean()
+
+
+def _mask_nonpositive(values: np.ndarray) -> np.ndarray:
+    """Replace nonpositive values with NaN for plotting on a log scale.
+
+    Matplotlib leaves out NaN points directly, while zeros (e.g., of
+    masked pixels) go through the log transform first and are clipped
+    or masked only afterwards. The gaps in the line are the same.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Values to plot.
+
+    Returns
+    -------
+    np.ndarray
+        Float copy of the values with NaN in place of nonpositive ones.
+    """
+    return np.where(values > 0, values, np.nan)
+
+
+def _write_bytes(file_path: str, data: bytes) -> None:
+    """Write bytes to a file.
+
+    Parameters
+    ----------
+    file_path : str
+        Path to the file to write.
+    data : bytes
+        Data to write.
+    """
+    with open(file_path, "wb") as f:
+        f.write(data)
+
+
+def _unpack_and_count(
+    file: str,
+    daughterboard_number: str,
+    motherboard_number: str,
+    firmware_version: str,
+    timestamps: int,
+    layout: dict,
+    absolute_timestamps: bool,
+) -> tuple[np.ndarray, int, int]:
+    """Unpack a single data file and count valid timestamps per pixel.
+
+    Parameters
+    ----------
+    file : str
+        Path to the data file.
+    daughterboard_number : str
+        The LinoSPAD2 daughterboard number.
+    motherboard_number : str
+        LinoSPAD2 motherboard (FPGA) number.
+    firmware_version : str
+        LinoSPAD2 firmware version.
+    timestamps : int
+        Number of timestamps per pixel per acquisition cycle.
+    layout : dict
+        Pixel lookup tables for the firmware version used, see
+        '_build_pixel_layout'.
+    absolute_timestamps : bool
+        Indicator for data files with absolute timestamps.
+
+    Returns
+    -------
+    tuple[np.ndarray, int, int]
+        Number of valid timestamps in each of the 256 pixels, the
+        largest timestamp and the total number of timestamps in the
+        file, the last two used for calculating rates.
+    """
+    if not absolute_timestamps:
+        return _count_raw_timestamps(file, timestamps, layout)
+
+    data_all, _ = f_up.unpack_binary_data_with_absolute_timestamps(
+        file,
+        daughterboard_number,
+        motherboard_number,
+        firmware_version,
+        timestamps,
+        include_offset=False,
+        apply_calibration=False,
+    )
+    # The pixel coordinates and the timestamps, the latter converted
+    # to ps; '-2' marks the end of each cycle in both
+    data_pixels = data_all[..., 0]
+    data_timestamps = data_all[..., 1]
+
+    # The largest timestamp in the units of the binary data, as for
+    # the files without absolute timestamps
+    valid_timestamps = data_timestamps[data_timestamps >= 0]
+    max_timestamp = (
+        round(int(valid_timestamps.max()) * 140 / 2500)
+        if valid_timestamps.size
+        else -1
+    )
+
+    return (
+        _count_timestamps_per_pixel(data_pixels, data_timestamps, layout),
+        max_timestamp,
+        int(np.count_nonzero(data_pixels != -2)),
+    )
+
+
+@functools.lru_cache(maxsize=1024)
+def _unpack_and_count_cached(
+    file: str,
+    mtime_ns: int,
+    file_size: int,
+    daughterboard_number: str,
+    motherboard_number: str,
+    firmware_version: str,
+    timestamps: int,
+    absolute_timestamps: bool,
+) -> tuple[np.ndarray, int, int]:
+    """Unpack a single data file and count valid timestamps, cached.
+
+    Only the 256 counts and two scalars are kept per file, so repeated
+    calls on the same files (e.g., first without and then with rates)
+    do not unpack them again. The modification time and the size of
+    the file are part of the cache key, so a rewritten file is
+    unpacked anew.
+
+    Parameters
+    ----------
+    file : str
+        Absolute path to the data file.
+    mtime_ns : int
+        Modification time of the file, in nanoseconds.
+    file_size : int
+        Size of the file in bytes.
+    daughterboard_number : str
+        The LinoSPAD2 daughterboard number.
+    motherboard_number : str
+        LinoSPAD2 motherboard (FPGA) number.
+    firmware_version : str
+        LinoSPAD2 firmware version.
+    timestamps : int
+        Number of timestamps per pixel per acquisition cycle.
+    absolute_timestamps : bool
+        Indicator for data files with absolute timestamps.
+
+    Returns
+    -------
+    tuple[np.ndarray, int, int]
+        See '_unpack_and_count'; the array of counts is read-only.
+    """
+    counts, max_timestamp, number_of_timestamps = _unpack_and_count(
+        file,
+        daughterboard_number,
+        motherboard_number,
+        firmware_version,
+        timestamps,
+        _get_pixel_layout(firmware_version),
+        absolute_timestamps,
+    )
+    counts.flags.writeable = False
+
+    return counts, max_timestamp, number_of_timestamps
+
 
 def collect_data_and_apply_mask(
     files: List[str] | str,
@@ -58,12 +541,14 @@ def collect_data_and_apply_mask(
     calculate_rates: bool = False,
     acq_window_length: float | None = None,
     number_of_cycles: float | None = None,
+    save_format: str = "npy",
 ) -> np.ndarray | tuple[np.ndarray, np.ndarray]:
     """Collect data from files and return number of timestamps in pixels.
 
     Unpacks data and returns the number of timestamps (and photon rate)
     in each pixel. Optionally, aplly mask or hot pixels, save the data
-    into a file.
+    into a file. Counts of already processed files are reused as long
+    as the files are not modified.
 
 
     Parameters
@@ -83,6 +568,10 @@ def collect_data_and_apply_mask(
     absolute_timestamps : bool, optional
         Indicator for data files with absolute timestamps. Default is
         False.
+    save_to_file : bool, optional
+        Switch for saving the number of timestamps per pixel into the
+        "senpop_data" folder next to the data files. The default is
+        False.
     correct_pix_address : bool, optional
         Check for correcting the pixel addressing. The default is False.
     calculate_rates : bool, optional
@@ -94,86 +583,88 @@ def collect_data_and_apply_mask(
     number_of_cycles : float, optional
         Number of acquisition cycles per data file. If None,
         estimated from the data. The default is None.
+    save_format : str, optional
+        Format of the file with the number of timestamps per pixel:
+        "npy" for NumPy binary or "txt" for text. The default is "npy".
 
     Returns
     -------
     timestamps_per_pixel : ndarray of shape (256,)
-        Number of valid timestamps accumulated in each pixel.
+        Number of valid timestamps accumulated in each pixel, as
+        unsigned 64-bit integers.
     rates : ndarray of shape (256,), optional
         Returned only when 'calculate_rates=True'. Photon detection rates
         per pixel, in events per second.
     """
-    # Define matrix of pixel coordinates, where rows are numbers of TDCs
-    # and columns are the pixels that connected to these TDCs
-    if firmware_version == "2212s":
-        pixel_coordinates = np.arange(256).reshape(4, 64).T
-    elif firmware_version == "2212b":
-        pixel_coordinates = np.arange(256).reshape(64, 4)
-    else:
-        print("\nFirmware version is not recognized.")
-        sys.exit()
-
-    timestamps_per_pixel = np.zeros(256)
+    # Exit early on an unknown firmware version, before any unpacking
+    _get_pixel_layout(firmware_version)
 
     # In the case a single file is passed, make a list out of it
     if isinstance(files, str):
         files = [files]
 
-    for i in tqdm(range(len(files)), desc="Collecting data"):
-        if not absolute_timestamps:
-            data_pixels, data_timestamps = f_up.unpack_binary_data(
-                files[i],
+    # Counts are collected for each file separately and summed in a
+    # single reduction once all files are processed. The files are
+    # independent, so a few are unpacked concurrently: NumPy releases
+    # the GIL for most of the work, and the number of workers is kept
+    # low as each holds a whole unpacked file in memory. The counts of
+    # each file are cached, so calling again on the same files (e.g.,
+    # to get the rates as well) does not unpack them again
+    timestamps_per_file = np.empty((len(files), 256), dtype=np.uint32)
+
+    with ThreadPoolExecutor(
+        max_workers=min(4, os.cpu_count() or 1)
+    ) as executor:
+
+        def _counts_of_file(file):
+            file = os.path.abspath(file)
+            file_stat = os.stat(file)
+            return _unpack_and_count_cached(
+                file,
+                file_stat.st_mtime_ns,
+                file_stat.st_size,
                 daughterboard_number,
                 motherboard_number,
                 firmware_version,
                 timestamps,
+                absolute_timestamps,
             )
-        else:
-            data_pixels, data_timestamps, _ = (
-                f_up.unpack_binary_data_with_absolute_timestamps(
-                    files[i],
-                    daughterboard_number,
-                    motherboard_number,
-                    firmware_version,
-                    timestamps,
-                    include_offset=False,
-                    apply_calibration=False,
-                )
-            )
-        for i in range(256):
-            # tdc, pix = np.argwhere(pix_coor == i)[0]
-            # ind = np.where(data[tdc].T[0] == pix)[0]
-            # ind1 = np.where(data[tdc].T[1][ind] > 0)[0]
-            # timestamps_per_pixel[i] += len(data[tdc].T[1][ind[ind1]])
-            tdc, pix = np.argwhere(pixel_coordinates == i)[0]
-            mask = (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
-            ind = np.nonzero(mask)[0]
-            timestamps_per_pixel[i] += len(data_timestamps[tdc][ind])
+
+        file_results = executor.map(_counts_of_file, files)
+        # The largest timestamp and the number of timestamps are
+        # accumulated over all files for calculating the rates
+        max_timestamp = 0
+        number_of_timestamps = 0
+        for i, (counts, file_max_timestamp, file_timestamps) in enumerate(
+            tqdm(file_results, total=len(files), desc="Collecting data")
+        ):
+            timestamps_per_file[i] = counts
+            max_timestamp = max(max_timestamp, file_max_timestamp)
+            number_of_timestamps += file_timestamps
+
+    timestamps_per_pixel = timestamps_per_file.sum(axis=0, dtype=np.uint64)
 
     if correct_pix_address:
-        fix = np.zeros(len(timestamps_per_pixel))
-        fix[:128] = timestamps_per_pixel[128:]
-        fix[128:] = np.flip(timestamps_per_pixel[:128])
-        timestamps_per_pixel = fix
-        del fix
+        timestamps_per_pixel = _remap_pix_address(timestamps_per_pixel)
 
     # Apply mask if requested
     if apply_hot_pixel_mask:
-        mask = utils.apply_mask(daughterboard_number, motherboard_number)
-        timestamps_per_pixel[mask] = 0
-
-    # if calculate_rates:
-    #     if acq_window_length is None:
-    #         acq_window_length = np.max(data[:].T[1]) * 1e-12
-    #     if number_of_cycles is None:
-    #         number_of_cycles = len(np.where(data[0].T[0] == -2)[0])
+        timestamps_per_pixel[
+            utils.hot_pixel_mask(daughterboard_number, motherboard_number)
+        ] = 0
+
     if calculate_rates:
+        # Reduce first and scale the scalar afterwards instead of
+        # scaling the whole array
         if acq_window_length is None:
             acq_window_length = (
-                np.max(data_timestamps * 2500 / 140).astype(int) * 1e-12
+                int(max_timestamp * 2500 / 140) * 1e-12
             )  # transform to seconds
         if number_of_cycles is None:
-            number_of_cycles = len(data_timestamps.flatten()) / 64 / timestamps
+            # Average number of cycles per file
+            number_of_cycles = (
+                number_of_timestamps / len(files) / 64 / timestamps
+            )
 
         print(acq_window_length)
 
@@ -185,16 +676,28 @@ def collect_data_and_apply_mask(
         )
 
     if save_to_file:
-        files.sort(key=os.path.getmtime)
-        file_name = files[0][:-4] + "-" + files[-1][:-4]
-        try:
-            os.chdir("senpop_data")
-        except FileNotFoundError as _:
-            os.mkdir("senpop_data")
-            os.chdir("senpop_data")
+        files = sorted(files, key=os.path.getmtime)
+        file_name = (
+            os.path.basename(files[0])[:-4]
+            + "-"
+            + os.path.basename(files[-1])[:-4]
+        )
+        # Saved next to the data files
+        senpop_dir = os.path.join(
+            os.path.dirname(os.path.abspath(files[0])), "senpop_data"
+        )
+        os.makedirs(senpop_dir, exist_ok=True)
 
-        np.savetxt(f"{file_name}_senpop_numbers.txt", timestamps_per_pixel)
-        os.chdir("..")
+        if save_format == "npy":
+            np.save(
+                os.path.join(senpop_dir, f"{file_name}_senpop_numbers.npy"),
+                timestamps_per_pixel,
+            )
+        else:
+            np.savetxt(
+                os.path.join(senpop_dir, f"{file_name}_senpop_numbers.txt"),
+                timestamps_per_pixel,
+            )
 
     if calculate_rates:
         return timestamps_per_pixel, rates
@@ -202,6 +705,97 @@ def collect_data_and_apply_mask(
         return timestamps_per_pixel
 
 
+def _collect_data_cached(
+    cache_dir: str,
+    files: List[str],
+    daughterboard_number: str,
+    motherboard_number: str,
+    firmware_version: str,
+    timestamps: int,
+    apply_hot_pixel_mask: bool,
+    absolute_timestamps: bool,
+) -> np.ndarray:
+    """Collect the sensor population, reusing a cached result.
+
+    The population is cached as a '.npy' file, named by a hash of the
+    data files, their size and modification time, the hot pixels of
+    the mask, the collection parameters and the cache version. Any
+    change to the data files or the mask results in a new collection.
+
+    Parameters
+    ----------
+    cache_dir : str
+        Folder for the cached populations, created if it does not exist.
+    files : List[str]
+        Paths to the data files.
+    daughterboard_number : str
+        The LinoSPAD2 daughterboard number.
+    motherboard_number : str
+        LinoSPAD2 motherboard (FPGA) number.
+    firmware_version : str
+        LinoSPAD2 firmware version.
+    timestamps : int
+        Number of timestamps per pixel per acquisition cycle.
+    apply_hot_pixel_mask : bool
+        Switch for applying the mask on warm/hot pixels.
+    absolute_timestamps : bool
+        Indicator for data files with absolute timestamps.
+
+    Returns
+    -------
+    np.ndarray
+        Number of valid timestamps accumulated in each pixel.
+    """
+    key = hashlib.blake2b(digest_size=8)
+    key.update(f"{_CACHE_VERSION};".encode())
+    for file in files:
+        file_stat = os.stat(file)
+        key.update(
+            f"{os.path.abspath(file)}:{file_stat.st_size}:"
+            f"{file_stat.st_mtime_ns};".encode()
+        )
+    key.update(
+        repr(
+            (
+                daughterboard_number,
+                motherboard_number,
+                firmware_version,
+                timestamps,
+                apply_hot_pixel_mask,
+                absolute_timestamps,
+            )
+        ).encode()
+    )
+    # The key holds the same mask that 'collect_data_and_apply_mask'
+    # applies, so that a cached population always matches its key
+    if apply_hot_pixel_mask:
+        key.update(
+            utils.hot_pixel_mask(
+                daughterboard_number, motherboard_number
+            ).tobytes()
+        )
+    cache_file = os.path.join(
+        cache_dir, f"{motherboard_number}_{key.hexdigest()}.npy"
+    )
+
+    if os.path.isfile(cache_file):
+        return np.load(cache_file)
+
+    timestamps_per_pixel = collect_data_and_apply_mask(
+        files,
+        daughterboard_number,
+        motherboard_number,
+        firmware_version,
+        timestamps,
+        apply_hot_pixel_mask,
+        absolute_timestamps,
+    )
+    os.makedirs(cache_dir, exist_ok=True)
+    np.save(cache_file, timestamps_per_pixel)
+
+    return timestamps_per_pixel
+
+
 def plot_single_pix_hist(
     path,
     pixels,
@@ -258,20 +852,37 @@ def plot_single_pix_hist(
     if isinstance(motherboard_number, str) is not True:
         raise TypeError("'motherboard_number' should be a string")
 
+    # Lookup tables of TDC number and position in the TDC for each pixel
+    layout = _get_pixel_layout(firmware_version)
+
     def _lin_fit(x, a, b):
         return a * x + b
 
     if type(pixels) is int:
         pixels = [pixels]
+    elif pixels is None:
+        pixels = np.arange(145, 165, 1)
+
+    bin_width = 2500 / 140 * multiplier  # bin size of 17.867 us
+    bins = np.arange(0, cycle_length, bin_width)
 
-    os.chdir(path)
+    # Buffer for the histogram counts, reused for all pixels and files
+    n = np.empty(len(bins) - 1, dtype=np.int64)
 
-    # data_files = glob.glob("*.dat*")
-    data_files = glob.glob("*.dat*")
-    data_files.sort(key=os.path.getmtime)
+    data_files = _list_data_files_by_mtime(path)
+
+    results_dir = os.path.join(path, "results", "single pixel histograms")
+    os.makedirs(results_dir, exist_ok=True)
+
+    # A single figure is reused for all histograms, it is cleared
+    # before plotting each pixel
+    fig, ax = plt.subplots(figsize=(16, 10))
 
     for i, num in enumerate(data_files):
-        print(f"> > > Plotting pixel histograms, Working on {num} < < <\n")
+        file_name = os.path.basename(num)
+        print(
+            f"> > > Plotting pixel histograms, Working on {file_name} < < <\n"
+        )
 
         data_pixels, data_timestamps = f_up.unpack_binary_data(
             num,
@@ -281,37 +892,30 @@ def plot_single_pix_hist(
             timestamps,
         )
 
-        bins = np.arange(
-            0, cycle_length, 2500 / 140 * multiplier
-        )  # bin size of 17.867 us
-
-        if pixels is None:
-            pixels = np.arange(145, 165, 1)
-
         for i, _ in enumerate(pixels):
-            plt.figure(figsize=(16, 10))
-            # Define matrix of pixel coordinates, where rows are numbers
-            # of TDCs and columns are the pixels that connected to
-            # these TDCs
-            if firmware_version == "2212s":
-                pix_coor = np.arange(256).reshape(4, 64).T
-            elif firmware_version == "2212b":
-                pix_coor = np.arange(256).reshape(64, 4)
-            else:
-                print("\nFirmware version is not recognized.")
-                sys.exit()
-            tdc, pix = np.argwhere(pix_coor == pixels[i])[0]
-            mask = (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
-            ind = np.nonzero(mask)[0]
-            data_to_plot = data_timestamps[tdc][ind]
-
-            n, b, p = plt.hist(data_to_plot, bins=bins, color=color)
+            ax.clear()
+            tdc = layout["tdc_of_pix"][pixels[i]]
+            pix = layout["col_of_pix"][pixels[i]]
+            data_to_plot = data_timestamps[tdc][
+                (data_pixels[tdc] == pix) & (data_timestamps[tdc] >= 0)
+            ]
+
+            # Bins of the timestamps as in 'np.histogram': each bin holds
+            # the values from its left edge up to its right one, the
+            # last bin also the values at its right edge; timestamps
+            # outside the bins are dropped
+            bin_index = np.searchsorted(bins, data_to_plot, side="right") - 1
+            bin_index[data_to_plot == bins[-1]] = len(n) - 1
+            bin_index = bin_index[(bin_index >= 0) & (bin_index < len(n))]
+            n[:] = np.bincount(bin_index, minlength=len(n))
+
+            ax.stairs(n, bins, fill=True, color=color)
             if fit_average is True:
                 av_win = np.zeros(int(len(n) / 10) + 1)
                 av_win_in = np.zeros(int(len(n) / 10) + 1)
                 for j, _ in enumerate(av_win):
                     av_win[j] = n[j * 10 : j * 10 + 1]
-                    av_win_in[j] = b[j * 10 : j * 10 + 1]
+                    av_win_in[j] = bins[j * 10 : j * 10 + 1]
 
                 a = 1
                 b = np.average(n)
@@ -320,21 +924,17 @@ def plot_single_pix_hist(
 
                 av_win_fit = _lin_fit(av_win_in, par[0], par[1])
 
-            plt.xlabel("Time (ps)")
-            plt.ylabel("Counts (-)")
-            # plt.plot(av_win_in, av_win, color="black", linewidth=8)
+            ax.set_xlabel("Time (ps)")
+            ax.set_ylabel("Counts (-)")
             if fit_average is True:
-                plt.gcf()
-                plt.plot(av_win_in, av_win_fit, linewidth=8)
-            plt.ticklabel_format(axis="y", style="sci", scilimits=(0, 0))
-            plt.title(f"Pixel {pixels[i]}")
-            try:
-                os.chdir("results/single pixel histograms")
-            except FileNotFoundError as _:
-                os.makedirs("results/single pixel histograms")
-                os.chdir("results/single pixel histograms")
-            plt.savefig(f"{num}, pixel {pixels[i]}.png")
-            os.chdir("../..")
+                ax.plot(av_win_in, av_win_fit, linewidth=8)
+            ax.ticklabel_format(axis="y", style="sci", scilimits=(0, 0))
+            ax.set_title(f"Pixel {pixels[i]}")
+            fig.savefig(
+                os.path.join(
+                    results_dir, f"{file_name}, pixel {pixels[i]}.png"
+                )
+            )
 
 
 def plot_sensor_population(
@@ -442,19 +1042,17 @@ def plot_sensor_population(
     if not isinstance(motherboard_number, str):
         raise TypeError("'motherboard_number' should be a string")
 
-    os.chdir(path)
-
-    # files = glob.glob("*.dat*")
-    files = glob.glob("*.dat*")
-    files.sort(key=os.path.getmtime)
+    files = _list_data_files_by_mtime(path)
 
     if single_file:
         files = files[0]
-        plot_name = files[:-4]
+        plot_name = os.path.basename(files)[:-4]
     else:
-        plot_name = files[0][:-4] + "-" + files[-1][:-4]
-
-    # valid_per_pixel = np.zeros(256)
+        plot_name = (
+            os.path.basename(files[0])[:-4]
+            + "-"
+            + os.path.basename(files[-1])[:-4]
+        )
 
     print(
         "\n> > > Collecting data for sensor population plot,"
@@ -476,6 +1074,11 @@ def plot_sensor_population(
         calculate_rates=True,
     )
 
+    # Find the peaks once, they are marked in both plots
+    if look_for_peaks:
+        threshold = _median(timestamps_per_pixel) * peak_threshold
+        peaks, _ = find_peaks(timestamps_per_pixel, height=threshold)
+
     # Plotting rates
     print("\n> > > Plotting < < <\n")
 
@@ -483,44 +1086,36 @@ def plot_sensor_population(
     fig_rates.subplots_adjust(top=0.94, right=0.93)
     if y_scale == "log":
         plt.yscale("log")
-    if np.max(rates) > 1e3:
-        (data_line,) = plt.plot(rates / 1e3, "o-")
-        plt.ylabel("Photon rate (kHz)")
-    elif np.max(rates) > 1e6:
-        (data_line,) = plt.plot(rates / 1e6, "o-")
-        plt.ylabel("Photon rate (MHz)")
+    # Pick the units based on the highest rate; the larger bound should
+    # be checked first
+    rates_max = rates.max()
+    if rates_max > 1e6:
+        scale, unit = 1e6, "MHz"
+    elif rates_max > 1e3:
+        scale, unit = 1e3, "kHz"
     else:
-        (data_line,) = plt.plot(rates, "o-")
-        plt.ylabel("Photon rate (Hz)")
+        scale, unit = 1, "Hz"
+    rates_to_plot = rates / scale
+    if y_scale == "log":
+        rates_to_plot = _mask_nonpositive(rates_to_plot)
+    (data_line,) = plt.plot(rates_to_plot, "o-")
+    plt.ylabel(f"Photon rate ({unit})")
     plt.xlabel("Pixel number (-)")
 
-    # Find and fit peaks if look_for_peaks is True
+    # Mark the peaks if look_for_peaks is True
     if look_for_peaks:
-        threshold = np.median(timestamps_per_pixel) * peak_threshold
-        peak_search_width = 5
-        peaks, _ = find_peaks(timestamps_per_pixel, height=threshold)
-        peaks = np.unique(peaks)
-
-        peak_handles = []
-        for peak_index in peaks:
-            x_peak = np.arange(
-                peak_index - peak_search_width,
-                peak_index + peak_search_width + 1,
-            )
-            cut_above_256 = np.where(x_peak >= 256)[0]
-            x_peak = np.delete(x_peak, cut_above_256)
-            peak_handles.append(
-                Line2D(
-                    [],
-                    [],
-                    marker="o",
-                    linestyle="--",
-                    color=data_line.get_color(),
-                    # markersize=8,
-                    label=f"Peak at {peak_index}, "
-                    f"Rate: {rates[peak_index]/1000:.0f} kHz",
-                )
+        peak_handles = [
+            Line2D(
+                [],
+                [],
+                marker="o",
+                linestyle="--",
+                color=data_line.get_color(),
+                label=f"Peak at {peak_index}, "
+                f"Rate: {rates[peak_index]/1000:.0f} kHz",
             )
+            for peak_index in peaks
+        ]
         plt.legend(handles=peak_handles, loc="best")
     else:
         plt.legend(loc="best")
@@ -531,262 +1126,63 @@ def plot_sensor_population(
     if y_scale == "log":
         plt.yscale("log")
 
-    (data_line,) = plt.plot(timestamps_per_pixel, "o-")
+    (data_line,) = plt.plot(
+        (
+            _mask_nonpositive(timestamps_per_pixel)
+            if y_scale == "log"
+            else timestamps_per_pixel
+        ),
+        "o-",
+    )
     plt.xlabel("Pixel number (-)")
     plt.ylabel("Photons (-)")
-    # Find and fit peaks if look_for_peaks is True
+    # Mark the peaks if look_for_peaks is True
     if look_for_peaks:
-        threshold = np.median(timestamps_per_pixel) * peak_threshold
-        peak_search_width = 5
-        peaks, _ = find_peaks(timestamps_per_pixel, height=threshold)
-        peaks = np.unique(peaks)
-
-        peak_handles = []
-        for peak_index in peaks:
-            x_peak = np.arange(
-                peak_index - peak_search_width,
-                peak_index + peak_search_width + 1,
-            )
-            cut_above_256 = np.where(x_peak >= 256)[0]
-            x_peak = np.delete(x_peak, cut_above_256)
-            peak_handles.append(
-                Line2D(
-                    [],
-                    [],
-                    marker="o",
-                    linestyle="--",
-                    color=data_line.get_color(),
-                    # markersize=8,
-                    label=f"Peak at {peak_index}, "
-                    f"Rate: {rates[peak_index]/1000:.0f} kHz",
-                )
+        peak_handles = [
+            Line2D(
+                [],
+                [],
+                marker="o",
+                linestyle="--",
+                color=data_line.get_color(),
+                label=f"Peak at {peak_index}, "
+                f"Rate: {rates[peak_index]/1000:.0f} kHz",
             )
+            for peak_index in peaks
+        ]
         plt.legend(handles=peak_handles, loc="best")
     else:
         plt.legend(loc="best")
 
     # Save the figure
-    try:
-        os.chdir("results/sensor_population")
-    except FileNotFoundError:
-        os.makedirs("results/sensor_population")
-        os.chdir("results/sensor_population")
-    # fig.tight_layout()
+    results_dir = os.path.join(path, "results", "sensor_population")
+    os.makedirs(results_dir, exist_ok=True)
     if single_file:
-        fig_rates.savefig(f"{plot_name}_rates_single_file.png")
-        fig_photons.savefig(f"{plot_name}_photons_single_file.png")
-        print(
-            f"> > > The plot is saved as '{plot_name}.png'"
-            "in {os.getcwd()} < < <"
-        )
-        if pickle_fig:
-            pickle.dump(
-                fig_rates, open(f"{plot_name}_rates_single_file.pickle", "wb")
-            )
-            pickle.dump(
-                fig_photons,
-                open(f"{plot_name}_photons_single_file.pickle", "wb"),
-            )
+        rates_name = f"{plot_name}_rates_single_file"
+        photons_name = f"{plot_name}_photons_single_file"
     else:
-        fig_rates.savefig(f"{plot_name}_rates.png")
-        fig_photons.savefig(f"{plot_name}_photons.png")
-        print(
-            f"> > > The plot is saved as '{plot_name}.png' "
-            f"in {os.getcwd()} < < <"
-        )
-        if pickle_fig:
-            pickle.dump(fig_rates, open(f"{plot_name}_rates.pickle", "wb"))
-            pickle.dump(fig_photons, open(f"{plot_name}_photons.pickle", "wb"))
+        rates_name = f"{plot_name}_rates"
+        photons_name = f"{plot_name}_photons"
 
-    os.chdir("../..")
+    fig_rates.savefig(os.path.join(results_dir, f"{rates_name}.png"))
+    fig_photons.savefig(os.path.join(results_dir, f"{photons_name}.png"))
+    print(
+        f"> > > The plot is saved as '{rates_name}.png' "
+        f"in {results_dir} < < <"
+    )
+    if pickle_fig:
+        with open(
+            os.path.join(results_dir, f"{rates_name}.pickle"), "wb"
+        ) as f:
+            pickle.dump(fig_rates, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(
+            os.path.join(results_dir, f"{photons_name}.pickle"), "wb"
+        ) as f:
+            pickle.dump(fig_photons, f, protocol=pickle.HIGHEST_PROTOCOL)
 
     return fig_rates, fig_photons
 
 
-# def plot_sensor_population_rates(
-#     path: str,
-#     daughterboard_number: str,
-#     motherboard_number: str,
-#     firmware_version: str,
-#     timestamps: int = 512,
-#     y_scale: str = "linear",
-#     style: str = "-o",
-#     apply_hot_pixel_mask: bool = True,
-#     color: str = "rebeccapurple",
-#     correct_pix_address: bool = False,
-#     pickle_fig: bool = False,
-#     absolute_timestamps: bool = False,
-#     single_file: bool = False,
-# ) -> None:
-#     """Plot number of timestamps in each pixel for all datafiles.
-
-#     Plot sensor population as number of timestamps vs. pixel number.
-#     Analyzes all data files in the given folder. The output figure is saved
-#     in the "results" folder, which is created if it does not exist, in
-#     the same folder where datafiles are. Works with the firmware version
-#     '2212'.
-
-#     Parameters
-#     ----------
-#     path : str
-#         Path to the datafiles.
-#     daughterboard_number : str
-#         The LinoSPAD2 daughterboard number. Required for choosing the
-#         correct calibration data.
-#     motherboard_number : str
-#         The LinoSPAD2 motherboard number, including the "#".
-#     firmware_version : str
-#         LinoSPAD2 firmware version. Versions '2212b' (block) or '2212s'
-#         (skip) are recognized.
-#     timestamps : int, optional
-#         Number of timestamps per pixel per acquisition cycle. Default is
-#         "512".
-#     y_scale : str, optional
-#         Scale for the y-axis of the plot. Use "log" for logarithmic.
-#         The default is "linear".
-#     style : str, optional
-#         Style of the plot. The default is "-o".
-#     apply_hot_pixel_mask : bool, optional
-#         Switch for applying the mask on warm/hot pixels. The default is
-#         True.
-#     color : str, optional
-#         Color for the plot. The default is 'rebeccapurple'.
-#     correct_pix_address : bool, optional
-#         Switch for correcting pixel addressing for the faulty firmware
-#         version for the 23 side of the daughterboard. The default is
-#         False.
-#     pickle_fig : bool, optional
-#         Switch for pickling the figure. Can be used when plotting takes
-#         a lot of time. The default is False.
-#     absolute_timestamps : bool, optional
-#         Indicator for data files with absolute timestamps. Default is
-#         False.
-#     single_file : optional
-#         Switch for using only the first file in the folder. Can be
-#         utilized for a quick plot. The default is False.
-
-#     Returns
-#     -------
-#     None.
-
-#     Examples
-#     -------
-#     An example how the function can be used to get the sensor
-#     occupation from a single file while looking for peaks - the most
-#     quick and straightforward approach to find where the beams were
-#     focused and get the peak position for further use in, e.g., delta_t
-#     functions. Here, the data were collected using the '23'-side
-#     sensor half which required correction of the pixel addressing.
-#     Offset calibration for the sensor is not available therefore
-#     it should be skipped.
-
-#     First, get the absolute path to where the '.dat' files are.
-#     >>> path = r'C:/Path/To/Data'
-
-#     Now to the function itself.
-#     >>> plot_sensor_popuation(
-#     >>> path,
-#     >>> daughterboard_number="NL11",
-#     >>> motherboard_number="#21",
-#     >>> firmware_version="2212s",
-#     >>> timestamps = 1000,
-#     >>> correct_pix_address = True,
-#     >>> find_peaks = True,
-#     >>> single_file = True,
-#     >>> )
-#     """
-#     # parameter type check
-#     if not isinstance(firmware_version, str):
-#         raise TypeError(
-#             "'firmware_version' should be a string, '2212b' or '2212s'"
-#         )
-#     if not isinstance(daughterboard_number, str):
-#         raise TypeError(
-#             "'daughterboard_number' should be a string, 'NL11' or 'A5'"
-#         )
-#     if not isinstance(motherboard_number, str):
-#         raise TypeError("'motherboard_number' should be a string")
-
-#     os.chdir(path)
-
-#     files = glob.glob("*.dat*")
-#     files.sort(key=os.path.getmtime)
-
-#     if single_file:
-#         files = files[0]
-#         plot_name = files[:-4]
-#     else:
-#         plot_name = files[0][:-4] + "-" + files[-1][:-4]
-
-#     print(
-#         "\n> > > Collecting data for sensor population plot,"
-#         f"Working in {path} < < <\n"
-#     )
-
-#     # If fitting the peaks, calculate the photon rates in each peak as
-#     # well
-#     _, rates = collect_data_and_apply_mask(
-#         files,
-#         daughterboard_number,
-#         motherboard_number,
-#         firmware_version,
-#         timestamps,
-#         apply_hot_pixel_mask,
-#         absolute_timestamps,
-#         save_to_file=False,
-#         correct_pix_address=correct_pix_address,
-#         calculate_rates=True,
-#     )
-
-#     # Plotting
-#     print("\n> > > Plotting < < <\n")
-#     plt.rcParams.update({"font.size": 30})
-#     fig = plt.figure(figsize=(16, 10))
-#     fig.subplots_adjust(top=0.94, right=0.93)
-#     if y_scale == "log":
-#         plt.yy_scale("log")
-#     if np.max(rates) > 1e3:
-#         plt.plot(rates / 1e3, style, color=color)
-#         plt.ylabel("Photon rate (kHz)")
-#     elif np.max(rates) > 1e6:
-#         plt.plot(rates / 1e6, style, color=color)
-#         plt.ylabel("Photon rate (MHz)")
-#     else:
-#         plt.plot(rates, style, color=color)
-#         plt.ylabel("Photon rate (Hz)")
-#     plt.xlabel("Pixel number (-)")
-
-#     # Save the figure
-#     try:
-#         os.chdir("results/sensor_population")
-#     except FileNotFoundError:
-#         os.makedirs("results/sensor_population")
-#         os.chdir("results/sensor_population")
-#     # fig.tight_layout()
-#     if single_file:
-#         plt.savefig(f"{plot_name}_single_file_ver2.png")
-#         print(
-#             "> > > The plot is saved as '{plot_name}_rates_single_file.png'"
-#             "in {os.getcwd()} < < <"
-#         )
-#         if pickle_fig:
-#             pickle.dump(
-#                 fig, open(f"{plot_name}_rates_single_file.pickle", "wb")
-#             )
-#     else:
-#         plt.savefig(f"{plot_name}.png")
-#         print(
-#             f"> > > The plot is saved as '{plot_name}_rates.png' "
-#             f"in {os.getcwd()} < < <"
-#         )
-#         if pickle_fig:
-#             pickle.dump(fig, open(f"{plot_name}_rates.pickle", "wb"))
-
-#     os.chdir("../..")
-
-#     return fig
-
-
 def plot_sensor_population_full_sensor(
     path,
     daughterboard_number: str,
@@ -887,130 +1283,155 @@ def plot_sensor_population_full_sensor(
     if not isinstance(motherboard_number2, str):
         raise TypeError("'motherboard_number2' should be a string")
 
-    valid_per_pixel1 = np.zeros(256)
-    valid_per_pixel2 = np.zeros(256)
-
     # Get the two folders with data from both FPGAs/sensor halves
-    os.chdir(path)
-    path1 = glob.glob(f"*{motherboard_number1}*")[0]
-    path2 = glob.glob(f"*{motherboard_number2}*")[0]
+    path1 = _find_motherboard_folder(path, motherboard_number1)
+    path2 = _find_motherboard_folder(path, motherboard_number2)
 
-    # First motherboard / half of the sensor
-    os.chdir(path1)
-    # files1 = sorted(glob.glob("*.dat*"))
-
-    files1 = glob.glob("*.dat*")
-    files1.sort(key=os.path.getmtime)
+    files1 = _list_data_files_by_mtime(path1)
+    files2 = _list_data_files_by_mtime(path2)
 
     if single_file:
-        files1 = files1[0]
-    plot_name1 = files1[0][:-4] + "-"
+        files1 = files1[:1]
+        files2 = files2[:1]
+    plot_name1 = os.path.basename(files1[0])[:-4] + "-"
+    plot_name2 = os.path.basename(files2[-1])[:-4]
 
     print(
-        "\n> > > Collecting data for sensor population plot,"
-        f"Working in {path1} < < <\n"
+        "\n> > > Collecting data for sensor population plot, "
+        f"Working in {path1} and {path2} < < <\n"
     )
 
-    valid_per_pixel1 = collect_data_and_apply_mask(
-        files1,
-        daughterboard_number,
-        motherboard_number1,
-        firmware_version,
-        timestamps,
-        apply_hot_pixel_mask,
-        absolute_timestamps,
+    # With both halves pointing to the same data and the same mask, the
+    # population is collected only once
+    same_data = os.path.samefile(path1, path2) and (
+        motherboard_number1 == motherboard_number2 or not apply_hot_pixel_mask
     )
 
-    os.chdir("..")
-
-    # Second motherboard / half of the sensor
-    os.chdir(path2)
-    # files2 = sorted(glob.glob("*.dat*"))
-    files2 = glob.glob("*.dat*")
-    files2.sort(key=os.path.getmtime)
-    if single_file:
-        files2 = files2[0]
-    plot_name2 = files2[-1][:-4]
+    # Populations from previous runs on the same data are reused
+    cache_dir = os.path.join(path, "results", ".cache")
 
-    print(
-        "\n> > > Collecting data for sensor population plot,"
-        f"Working in {path2} < < <\n"
-    )
-    valid_per_pixel2 = collect_data_and_apply_mask(
-        files2,
-        daughterboard_number,
-        motherboard_number2,
-        firmware_version,
-        timestamps,
-        apply_hot_pixel_mask,
-        absolute_timestamps,
-    )
-
-    # Fix pixel addressing for the second board
-    fix = np.zeros(len(valid_per_pixel2))
-    fix[:128] = valid_per_pixel2[128:]
-    fix[128:] = np.flip(valid_per_pixel2[:128])
-    valid_per_pixel2 = fix
-    del fix
-
-    # Concatenate and plot
-    valid_per_pixel = np.concatenate([valid_per_pixel1, valid_per_pixel2])
+    # The two halves of the sensor are independent, collect them
+    # concurrently
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        future1 = executor.submit(
+            _collect_data_cached,
+            cache_dir,
+            files1,
+            daughterboard_number,
+            motherboard_number1,
+            firmware_version,
+            timestamps,
+            apply_hot_pixel_mask,
+            absolute_timestamps,
+        )
+        if not same_data:
+            future2 = executor.submit(
+                _collect_data_cached,
+                cache_dir,
+                files2,
+                daughterboard_number,
+                motherboard_number2,
+                firmware_version,
+                timestamps,
+                apply_hot_pixel_mask,
+                absolute_timestamps,
+            )
+        valid_per_pixel1 = future1.result()
+        valid_per_pixel2 = valid_per_pixel1 if same_data else future2.result()
+
+    # Concatenate the halves, fixing pixel addressing for the second
+    # board on the way
+    valid_per_pixel = np.empty(512, dtype=valid_per_pixel1.dtype)
+    valid_per_pixel[:256] = valid_per_pixel1
+    _remap_pix_address(valid_per_pixel2, out=valid_per_pixel[256:])
     plot_name = plot_name1 + plot_name2
 
     print("\n> > > Plotting < < <\n")
 
-    fig = plt.figure(figsize=(16, 10))
+    fig, ax = plt.subplots(figsize=(16, 10))
     fig.subplots_adjust(top=0.94, right=0.93)
     if y_scale == "log":
-        plt.yy_scale("log")
-    plt.plot(valid_per_pixel, style, color=color)
-    plt.xlabel("Pixel number (-)")
-    plt.ylabel("Photons (-)")
+        ax.set_yscale("log")
+        ax.plot(_mask_nonpositive(valid_per_pixel), style, color=color)
+    else:
+        ax.plot(valid_per_pixel, style, color=color)
+    ax.set_xlabel("Pixel number (-)")
+    ax.set_ylabel("Photons (-)")
 
     # Find and fit peaks if find_peaks is True
     if find_peaks:
-        threshold = np.median(valid_per_pixel) * peak_threshold
+        threshold = _median(valid_per_pixel) * peak_threshold
         fit_width = 10
-        peaks, _ = find_peaks(valid_per_pixel, height=threshold)
-        peaks = np.unique(peaks)
-
-        for peak_index in tqdm(peaks, desc="Fitting Gaussians"):
-            x_fit = np.arange(
-                peak_index - fit_width, peak_index + fit_width + 1
-            )
-            y_fit = valid_per_pixel[x_fit]
-            try:
-                params, _ = utils.fit_gaussian(x_fit, y_fit)
-            except Exception:
-                continue
-
-            # amplitude, position, width = params
-            # position = np.clip(int(position), 0, 255)
-
-            plt.plot(
-                x_fit,
-                utils.gaussian(x_fit, *params),
-                "--",
-                label=f"Peak at {peak_index}",
-            )
-
-        plt.legend()
-
-    os.chdir("..")
-
-    try:
-        os.chdir("results/sensor_population")
-    except FileNotFoundError:
-        os.makedirs("results/sensor_population")
-        os.chdir("results/sensor_population")
+        # Neighbouring maxima within one fit window and shallow bumps on
+        # top of a peak would only produce duplicate fits
+        peaks, _ = sg.find_peaks(
+            valid_per_pixel,
+            height=threshold,
+            distance=fit_width,
+            prominence=threshold * 0.5,
+        )
+        # Only peaks with the whole fit window on the sensor are fitted
+        peaks = peaks[
+            (peaks >= fit_width) & (peaks < len(valid_per_pixel) - fit_width)
+        ]
+
+        if len(peaks):
+            # The fits are independent of each other and are done in a
+            # single batch, one row per peak
+            x_fits = peaks[:, None] + np.arange(-fit_width, fit_width + 1)
+            y_fits = np.lib.stride_tricks.sliding_window_view(
+                valid_per_pixel, 2 * fit_width + 1
+            )[peaks - fit_width]
+            fit_params = utils.fit_gaussians(x_fits, y_fits)
+
+            fitted = ~np.isnan(fit_params).any(axis=1)
+            x_fits = x_fits[fitted]
+            y_fits = utils.gaussian(x_fits, *fit_params[fitted].T[..., None])
+            lines = ax.plot(x_fits.T, y_fits.T, "--")
+            for line, peak_index in zip(lines, peaks[fitted]):
+                line.set_label(f"Peak at {peak_index}")
+
+        ax.legend()
+
+    results_dir = os.path.join(path, "results", "sensor_population")
+    os.makedirs(results_dir, exist_ok=True)
     fig.tight_layout()
-    plt.savefig("{}.png".format(plot_name))
+    # The figure is serialized before it is drawn, as matplotlib objects
+    # cannot be shared between threads; writing the pickle to disk then
+    # overlaps with rendering the PNG
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        if pickle_fig:
+            pickle_written = executor.submit(
+                _write_bytes,
+                os.path.join(results_dir, f"{plot_name}.pickle"),
+                pickle.dumps(fig, protocol=pickle.HIGHEST_PROTOCOL),
+            )
+        fig.savefig(os.path.join(results_dir, f"{plot_name}.png"))
+        if pickle_fig:
+            pickle_written.result()
     print(
         f"> > > The plot is saved as '{plot_name}.png' "
-        f"in {os.getcwd()} < < <"
+        f"in {results_dir} < < <"
     )
-    if pickle_fig:
-        pickle.dump(fig, open(f"{plot_name}.pickle", "wb"))
+
+
+def _load_figure(plot_pickle_file: str):
+    """Load a pickled figure.
+
+    Parameters
+    ----------
+    plot_pickle_file : str
+        Path to the pickle file with the figure.
+
+    Returns
+    -------
+    matplotlib.figure.Figure
+        The unpickled figure.
+    """
+    # Read the figure in large chunks; the pickles are written by
+    # Python 3, so the Python 2 name remapping is not needed
+    with open(plot_pickle_file, "rb", buffering=1 << 20) as f:
+        return pickle.load(f, fix_imports=False)
 
 
 def unpickle_plot(plot_pickle_file: str) -> dict:
@@ -1041,23 +1462,18 @@ def unpickle_plot(plot_pickle_file: str) -> dict:
         is raised and an error message is printed.
     """
     try:
-        with open(plot_pickle_file, "rb") as f:
-            fig = pickle.load(f)
+        fig = _load_figure(plot_pickle_file)
     except FileNotFoundError as e:
         print(f" {e}")
 
     # Pack the data into a dictionary, first is the histogram, others
     # are the fits
-    plot_data = {}
-
-    # Extract the data; go over lines, stack them into dictionary
     ax = fig.axes[0]
-    for i, line in enumerate(ax.lines):
-        x, y = line.get_data()
-        if i == 0:
-            plot_data["Plot"] = (x, y)
-        else:
-            plot_data[f"Fit_{i}"] = (x, y)
+    lines_data = [line.get_data() for line in ax.lines]
+    plot_data = {
+        f"Fit_{i}" if i else "Plot": line_data
+        for i, line_data in enumerate(lines_data)
+    }
 
     # Extract the legend
     legend = ax.get_legend()
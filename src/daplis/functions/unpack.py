@@ -3,6 +3,18 @@
 This file can also be imported as a module and contains the following
 functions:
 
+    * _read_raw_data - read the 32-bit words of a binary data file,
+    memory-mapping it where possible.
+
+    * _decode_pixel_codes - decode the validity bit and the pixel
+    address of binary words into 8-bit codes.
+
+    * _decode_timestamps - decode the timestamps of binary words,
+    marking invalid ones with '-1'.
+
+    * _max_valid_timestamp - find the largest valid timestamp of binary
+    words without decoding all of them.
+
     * unpack_binary_data - function for unpacking data from LinoSPAD2,
     firmware version 2212. Utilizes the numpy library to speed up the
     process.
@@ -200,6 +212,99 @@ from daplis.functions.calibrate import load_calibration_data
 #     return data_all
 
 
+def _read_raw_data(file: str) -> np.ndarray:
+    """Read the 32-bit words of a binary data file.
+
+    The file is memory-mapped, so that the words are decoded straight
+    from the page cache without first copying the whole file into
+    memory. Empty files (e.g., from aborted acquisitions) and files
+    whose size is not a multiple of 4 bytes cannot be memory-mapped and
+    are read with `np.fromfile` instead.
+
+    Parameters
+    ----------
+    file : str
+        Path to the binary data file.
+
+    Returns
+    -------
+    np.ndarray
+        1D array of the 32-bit words.
+    """
+    file_size = os.path.getsize(file)
+    if file_size == 0 or file_size % 4:
+        return np.fromfile(file, dtype=np.uint32)
+
+    return np.memmap(file, dtype=np.uint32, mode="r")
+
+
+def _decode_pixel_codes(raw_data: np.ndarray) -> np.ndarray:
+    """Decode the validity bit and the pixel address of binary words.
+
+    The top bit of each word is set for valid timestamps and the 2 bits
+    above the 28-bit timestamp hold the pixel address in the TDC. Both
+    are extracted into a compact 8-bit code.
+
+    Parameters
+    ----------
+    raw_data : np.ndarray
+        Array of the 32-bit words.
+
+    Returns
+    -------
+    np.ndarray
+        8-bit codes of the same shape: 8-11 for valid timestamps of
+        the pixels 0-3 in the TDC, 0-3 for invalid ones.
+    """
+    pixel_codes = (raw_data >> 28).astype(np.uint8)
+    pixel_codes &= 0b1011
+
+    return pixel_codes
+
+
+def _decode_timestamps(raw_data: np.ndarray) -> np.ndarray:
+    """Decode the timestamps of binary words.
+
+    Parameters
+    ----------
+    raw_data : np.ndarray
+        Array of the 32-bit words.
+
+    Returns
+    -------
+    np.ndarray
+        Timestamps of the same shape as 32-bit integers, '-1' for
+        invalid timestamps.
+    """
+    # Timestamps are stored in the lower 28 bits, so they fit into
+    # 32-bit integers
+    data_timestamps = (raw_data & 0xFFFFFFF).astype(np.int32)
+    # Check the top bit, assign '-1' to invalid timestamps
+    data_timestamps[raw_data < 0x80000000] = -1
+
+    return data_timestamps
+
+
+def _max_valid_timestamp(raw_data: np.ndarray) -> int:
+    """Find the largest valid timestamp of binary words.
+
+    Parameters
+    ----------
+    raw_data : np.ndarray
+        Array of the 32-bit words.
+
+    Returns
+    -------
+    int
+        The largest valid timestamp, '-1' if there are none.
+    """
+    # With the pixel address cleared, valid words are larger than
+    # invalid ones and ordered by their timestamp
+    max_word = int(np.max(raw_data & np.uint32(0x8FFFFFFF), initial=0))
+
+    return max_word - 0x80000000 if max_word >> 31 else -1
+
+
 def unpack_binary_data(
     file: str,
     daughterboard_number: str,
@@ -228,7 +333,7 @@ def unpack_binary_data(
     data_pixels : array-like
         2D array of pixel coordinates in the TDC.
     data_timestamps : array-like
-        2D array of photon timestamps.
+        2D array of photon timestamps, as 32-bit integers.
     Raises
     ------
     TypeError
@@ -250,13 +355,10 @@ def unpack_binary_data(
         raise TypeError("'firmware_version' should be a string.")
 
     # Unpack binary data
-    raw_data = np.fromfile(file, dtype=np.uint32)
-    # Timestamps are stored in the lower 28 bits
-    data_timestamps = (raw_data & 0xFFFFFFF).astype(np.int64)
+    raw_data = _read_raw_data(file)
+    data_timestamps = _decode_timestamps(raw_data)
     # Pixel address in the given TDC is 2 bits above timestamp
-    data_pixels = ((raw_data >> 28) & 0x3).astype(np.int8)
-    # Check the top bit, assign '-1' to invalid timestamps
-    data_timestamps[raw_data < 0x80000000] = -1
+    data_pixels = (_decode_pixel_codes(raw_data) & 0b11).astype(np.int8)
     # Free up memory
     del raw_data
 
@@ -353,32 +455,24 @@ def unpack_binary_data_with_absolute_timestamps(
         raise TypeError("'firmware_version' should be a string.")
 
     # Unpack binary data
-    raw_data = np.fromfile(file_path, dtype=np.uint32)
-    # Timestamps are stored in the lower 28 bits
-    data_timestamps_all = (raw_data & 0xFFFFFFF).astype(np.int64)
+    raw_data = _read_raw_data(file_path)
     # Number of acquisition cycles in each data file
-    cycles = len(data_timestamps_all) // (timestamps * 65 + 2)
+    cycles = len(raw_data) // (timestamps * 65 + 2)
+
+    # Indices of absolute timestamps; absolute timestamps are inserted
+    # as two words at the start of each cycle
+    ind = (
+        np.arange(cycles)[:, None] * (65 * timestamps + 2) + np.arange(2)
+    ).ravel()
 
-    # List of indices of absolute timestamps
-    ind = []
     # Converted absolute timestamps: from binary to ps
     absolute_timestamps = np.zeros(cycles)
 
-    # Collect the absolute timestamps indices; absolute timestamps
-    # inserted at the start of each cycle
-    for cyc in range(cycles):
-        ind.extend(
-            [
-                x
-                for x in range(
-                    cyc * (65 * timestamps + 2),
-                    cyc * (65 * timestamps + 2) + 2,
-                )
-            ]
-        )
-
-    # Absolute timestamps only
-    data_absolute_timestamps = data_timestamps_all[ind].reshape(cycles, 2)
+    # Absolute timestamps only; timestamps are stored in the lower 28
+    # bits
+    data_absolute_timestamps = (
+        (raw_data[ind] & 0xFFFFFFF).astype(np.int64).reshape(cycles, 2)
+    )
 
     # Convert the absolute timestamps from binary to decimal (ps)
     for cyc in range(cycles):
@@ -393,11 +487,10 @@ def unpack_binary_data_with_absolute_timestamps(
 
     # Cut the absolute timestamps, collect the timestamps
     raw_data_cut = np.delete(raw_data, ind)
-    data_timestamps_cut = (raw_data_cut & 0xFFFFFFF).astype(np.int64)
-    data_timestamps_cut[raw_data_cut < 0x80000000] = -1
+    data_timestamps_cut = _decode_timestamps(raw_data_cut).astype(np.int64)
     # Pixel address in the given TDC is 2 bits above timestamp
-    data_pixels = ((raw_data_cut >> 28) & 0x3).astype(np.int8)
-    del raw_data
+    data_pixels = (_decode_pixel_codes(raw_data_cut) & 0b11).astype(np.int8)
+    del raw_data, raw_data_cut
     # Standard data: everything besides the absolute timestamps
 
     # Transform into matrix 65 by cycles*timestamps
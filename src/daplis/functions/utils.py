@@ -11,14 +11,26 @@ functions:
     * apply_mask - Apply a mask to the given data based on the
     daughterboard and motherboard numbers.
 
+    * hot_pixel_mask - Boolean mask of the hot pixels of a sensor half,
+    cached for each pair of boards.
+
     * unpickle_plot - Unpickle and display a matplotlib figure based on
     the specified type.
 
     * gaussian - Gaussian function for curve fitting.
 
+    * _gaussian_jacobian - Partial derivatives of the Gaussian function
+    with respect to its parameters.
+
     * fit_gaussian - Fit Gaussian function to data and return optimal
     parameters and covariance.
 
+    * _estimate_gaussians - Closed-form estimates of Gaussian peaks
+    from a weighted parabola fit to the log of the counts.
+
+    * fit_gaussians - Fit Gaussian functions to several data sets at
+    once and return the optimal parameters for each.
+
     * pixel_list_transform - Transform a list of pixels into two separate
     lists based on input type.
 
@@ -45,6 +57,7 @@ functions:
 
 from __future__ import annotations
 
+import functools
 import os
 import pickle
 import sys
@@ -56,7 +69,8 @@ import matplotlib
 import numpy as np
 import pandas as pd
 from pyarrow import feather as ft
-from scipy.optimize import curve_fit
+from scipy.optimize import curve_fit, least_squares
+from scipy.sparse import csr_matrix
 
 
 def apply_mask(
@@ -77,17 +91,53 @@ def apply_mask(
         The mask array generated from the given daughterboard and motherboard numbers.
     """
 
-    path_to_back = os.getcwd()
     path_to_mask = os.path.join(
         os.path.dirname(os.path.realpath(__file__)),
         "..",
         "params",
         "masks",
     )
-    os.chdir(path_to_mask)
-    file_mask = glob(f"*{daughterboard_number}_{motherboard_number}*")[0]
+    file_mask = glob(
+        os.path.join(
+            path_to_mask, f"*{daughterboard_number}_{motherboard_number}*"
+        )
+    )[0]
     mask = np.genfromtxt(file_mask).astype(int)
-    os.chdir(path_to_back)
+
+    return mask
+
+
+@functools.lru_cache(maxsize=16)
+def hot_pixel_mask(
+    daughterboard_number: str, motherboard_number: str
+) -> np.ndarray:
+    """Boolean mask of the hot pixels of a sensor half, cached.
+
+    The mask file is looked up and read only on the first call for the
+    given boards. The mask can be used as a look-up table, so that a
+    list of pixels is filtered with a single gather instead of a search
+    through the mask for each pixel.
+
+    Parameters
+    ----------
+    daughterboard_number : str
+        The LinoSPAD2 daughterboard number.
+    motherboard_number : str
+        LinoSPAD2 motherboard (FPGA) number, including the "#".
+
+    Returns
+    -------
+    np.ndarray
+        Read-only boolean array of 256 elements, True for hot pixels.
+    """
+    mask = np.zeros(256, dtype=bool)
+    mask[
+        np.asarray(
+            apply_mask(daughterboard_number, motherboard_number),
+            dtype=np.intp,
+        )
+    ] = True
+    mask.flags.writeable = False
 
     return mask
 
@@ -165,6 +215,41 @@ def gaussian(x, amp, mu, sigma, bkg):
     return amp * np.exp(-((x - mu) ** 2) / (2 * sigma**2)) + bkg
 
 
+def _gaussian_jacobian(x, amp, mu, sigma, bkg):
+    """Partial derivatives of the Gaussian function.
+
+    Parameters
+    ----------
+    x : array-like
+        The input data.
+    amp : float
+        Amplitude of the Gaussian.
+    mu : float
+        Mean (center) of the Gaussian.
+    sigma : float
+        Standard deviation of the Gaussian.
+    bkg : float
+        Background offset.
+
+    Returns
+    -------
+    array-like
+        Derivatives with respect to 'amp', 'mu', 'sigma' and 'bkg',
+        stacked along the last axis.
+
+    """
+    exp = np.exp(-((x - mu) ** 2) / (2 * sigma**2))
+    return np.stack(
+        np.broadcast_arrays(
+            exp,
+            amp * exp * (x - mu) / sigma**2,
+            amp * exp * (x - mu) ** 2 / sigma**3,
+            1.0,
+        ),
+        axis=-1,
+    )
+
+
 def fit_gaussian(x, y):
     """Fit Gaussian function to data.
 
@@ -205,6 +290,171 @@ def fit_gaussian(x, y):
     return popt, pcov
 
 
+def _estimate_gaussians(x, y, bkg):
+    """Closed-form estimates of Gaussian peaks above a background.
+
+    Fit a parabola to the logarithm of the background-subtracted
+    counts of each data set by weighted least squares (weights are
+    the squared counts, so that the noisy tails contribute little).
+    All data sets are solved at once via their 3x3 normal equations.
+
+    Parameters
+    ----------
+    x : np.ndarray
+        2D array of the x-axis data, one row per data set.
+    y : np.ndarray
+        2D array of the y-axis data, same shape as `x`.
+    bkg : np.ndarray
+        Background level of each data set.
+
+    Returns
+    -------
+    amp : np.ndarray
+        Amplitude estimates.
+    mu : np.ndarray
+        Position estimates.
+    sigma : np.ndarray
+        Width estimates.
+    valid : np.ndarray
+        Boolean mask of the data sets where the parabola opens
+        downwards, i.e., where the estimates are meaningful.
+
+    """
+    signal = y - bkg[:, None]
+    positive = signal > 0
+    weights = np.where(positive, signal, 0) ** 2
+    log_signal = np.log(np.where(positive, signal, 1))
+    # Center x for a better conditioned system
+    x_center = x.mean(axis=1)
+    xc = x - x_center[:, None]
+    design = np.stack([np.ones_like(xc), xc, xc**2], axis=-1)
+    normal_matrix = np.einsum("ijk,ij,ijl->ikl", design, weights, design)
+    normal_rhs = np.einsum("ijk,ij,ij->ik", design, weights, log_signal)
+
+    # At least three points above the background are needed
+    valid = positive.sum(axis=1) >= 3
+    normal_matrix[~valid] = np.eye(3)
+    c0, c1, c2 = np.linalg.solve(normal_matrix, normal_rhs[..., None])[
+        ..., 0
+    ].T
+    valid &= c2 < 0
+    c2 = np.where(valid, c2, -1)
+
+    sigma = np.sqrt(-1 / (2 * c2))
+    mu_centered = -c1 / (2 * c2)
+    amp = np.exp(np.minimum(c0 - c1**2 / (4 * c2), 700))
+    # Discard peaks centered outside the data or wider than it
+    half_span = (x.max(axis=1) - x.min(axis=1)) / 2
+    valid &= (
+        np.isfinite(amp)
+        & (np.abs(mu_centered) <= half_span)
+        & (sigma <= half_span / 2)
+    )
+
+    return amp, mu_centered + x_center, sigma, valid
+
+
+def fit_gaussians(x, y):
+    """Fit Gaussian functions to several data sets at once.
+
+    All data sets are fitted in a single least-squares problem. As each
+    data set depends only on its own parameters, the Jacobian is block
+    diagonal and is passed to the solver as a sparse matrix.
+
+    Parameters
+    ----------
+    x : array-like
+        2D array of the x-axis data, one row per data set.
+    y : array-like
+        2D array of the y-axis data, same shape as `x`.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (number of data sets, 4) with the optimal
+        values of the `gaussian` parameters for each data set. Rows
+        of the fits that did not converge to finite values, or to a
+        peak that stands out of the noise inside the data, are NaN.
+
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n_sets, n_points = y.shape
+
+    # Initial guess for the parameters: position and width from the
+    # moments of the data above the background, falling back to the
+    # guesses of 'fit_gaussian' where there is nothing above it
+    bkg_guess = np.median(y, axis=1)
+    amp_guess = np.max(y, axis=1) - bkg_guess
+    weights = np.clip(y - bkg_guess[:, None], 0, None)
+    weights_sum = weights.sum(axis=1)
+    has_signal = weights_sum > 0
+    weights_sum[~has_signal] = 1
+    mu_moment = np.einsum("ij,ij->i", weights, x) / weights_sum
+    sigma_moment = np.sqrt(
+        np.einsum("ij,ij->i", weights, (x - mu_moment[:, None]) ** 2)
+        / weights_sum
+    )
+    has_signal &= sigma_moment > 0
+    mu_guess = np.where(
+        has_signal, mu_moment, x[np.arange(n_sets), np.argmax(y, axis=1)]
+    )
+    sigma_guess = np.where(
+        has_signal, sigma_moment, np.minimum(np.std(x, axis=1), 150)
+    )
+    # Where a log-parabola through the peak opens downwards, its
+    # closed-form solution is a closer starting point than the moments
+    amp_quad, mu_quad, sigma_quad, has_peak = _estimate_gaussians(
+        x, y, bkg_guess
+    )
+    amp_guess = np.where(has_peak, amp_quad, amp_guess)
+    mu_guess = np.where(has_peak, mu_quad, mu_guess)
+    sigma_guess = np.where(has_peak, sigma_quad, sigma_guess)
+    p0 = np.column_stack([amp_guess, mu_guess, sigma_guess, bkg_guess])
+
+    # Nonzero pattern of the Jacobian: each residual depends on the four
+    # parameters of its own data set only
+    jac_rows = np.repeat(np.arange(n_sets * n_points), 4)
+    jac_cols = (
+        np.repeat(np.arange(n_sets) * 4, n_points)[:, None] + np.arange(4)
+    ).ravel()
+
+    def residuals(params):
+        amp, mu, sigma, bkg = params.reshape(n_sets, 4).T[..., None]
+        return (gaussian(x, amp, mu, sigma, bkg) - y).ravel()
+
+    def jacobian(params):
+        derivatives = _gaussian_jacobian(
+            x, *params.reshape(n_sets, 4).T[..., None]
+        )
+        return csr_matrix(
+            (derivatives.ravel(), (jac_rows, jac_cols)),
+            shape=(n_sets * n_points, n_sets * 4),
+        )
+
+    result = least_squares(
+        residuals, p0.ravel(), jac=jacobian, method="trf", x_scale="jac"
+    )
+
+    popt = result.x.reshape(n_sets, 4)
+    # Flat or low-signal data sets converge to a peak that is not there:
+    # discard fits with an amplitude below three times the spread of the
+    # residuals, centered outside the data or wider than it
+    residuals_rms = np.sqrt(np.mean(result.fun.reshape(n_sets, -1) ** 2, 1))
+    x_center = (x.max(axis=1) + x.min(axis=1)) / 2
+    half_span = (x.max(axis=1) - x.min(axis=1)) / 2
+    with np.errstate(invalid="ignore"):
+        converged = (
+            np.isfinite(popt).all(axis=1)
+            & (popt[:, 0] > 3 * residuals_rms)
+            & (np.abs(popt[:, 1] - x_center) <= half_span)
+            & (np.abs(popt[:, 2]) <= half_span)
+        )
+    popt[~converged] = np.nan
+
+    return popt
+
+
 def pixel_list_transform(pixels: list):
     """Transform a list of pixels into two separate lists.
 
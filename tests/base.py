@@ -0,0 +1,32 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+
+class TestDataFolderCase(unittest.TestCase):
+    """Base class for tests that run on a copy of the test data.
+
+    Each test class gets its own temporary folder with a copy of
+    'test_data_2212b.dat' in 'cls.path', so that the test classes do not
+    share any output and can run in parallel (e.g., with
+    'pytest -n auto').
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.path = tempfile.mkdtemp(prefix="daplis_")
+        shutil.copy(
+            os.path.join(
+                os.path.dirname(os.path.realpath(__file__)),
+                "test_data",
+                "test_data_2212b.dat",
+            ),
+            cls.path,
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        # Clean up after tests; leave the folder before removing it
+        os.chdir(os.path.dirname(os.path.realpath(__file__)))
+        shutil.rmtree(cls.path, ignore_errors=True)
@@ -0,0 +1,96 @@
+import unittest
+
+import numpy as np
+
+from daplis.functions.calc_diff import calculate_differences
+
+
+def _calculate_differences_loop(data, pixels, delta_window):
+    # Shifting window as in the original 'calculate_differences', used
+    # as the reference for the results
+    deltas_all = {}
+    for q in pixels[0]:
+        for w in pixels[1]:
+            if w <= q:
+                continue
+            deltas_all[f"{q},{w}"] = []
+            window_start_point = 0
+            n2 = len(data[f"{w}"])
+            for t_first_pixel in data[f"{q}"]:
+                window_limit_left = t_first_pixel - delta_window
+                window_limit_right = t_first_pixel + delta_window
+                while (
+                    window_start_point < n2
+                    and data[f"{w}"][window_start_point] < window_limit_left
+                ):
+                    window_start_point += 1
+                pointer_in_window = window_start_point
+                while (
+                    pointer_in_window < n2
+                    and data[f"{w}"][pointer_in_window] <= window_limit_right
+                ):
+                    dt = data[f"{w}"][pointer_in_window] - t_first_pixel
+                    deltas_all[f"{q},{w}"].append(dt)
+                    pointer_in_window += 1
+
+    return deltas_all
+
+
+class TestCalculateDifferences(unittest.TestCase):
+    def setUp(self):
+        self.pixels = [[0, 1], [2, 3]]
+        self.rng = np.random.default_rng(0)
+
+    def assert_same_as_loop(self, data, delta_window):
+        deltas = calculate_differences(data, self.pixels, delta_window)
+        deltas_loop = _calculate_differences_loop(
+            data, self.pixels, delta_window
+        )
+
+        self.assertEqual(deltas.keys(), deltas_loop.keys())
+        for pair, deltas_pair in deltas.items():
+            self.assertIsInstance(deltas_pair, list)
+            self.assertEqual(deltas_pair, deltas_loop[pair], pair)
+
+    def random_data(self, sort: bool):
+        data = {}
+        for pix in range(4):
+            timestamps = self.rng.integers(0, 10**6, self.rng.integers(50))
+            if sort:
+                timestamps.sort()
+            data[f"{pix}"] = timestamps
+        return data
+
+    def test_sorted(self):
+        for _ in range(50):
+            self.assert_same_as_loop(self.random_data(sort=True), 20e3)
+
+    def test_unsorted(self):
+        for _ in range(50):
+            self.assert_same_as_loop(self.random_data(sort=False), 20e3)
+        self.assert_same_as_loop(
+            {
+                "0": np.array([100, 0]),
+                "1": np.array([]),
+                "2": np.array([50, 0]),
+                "3": np.array([0, 100]),
+            },
+            60,
+        )
+
+    def test_padding_and_empty_pixels(self):
+        # Negative values mark missing timestamps (-1) and ends of
+        # cycles (-2), both at the start of the sorted timestamps and
+        # between cycles of unsorted ones
+        data = {
+            "0": np.array([-2, -2, -1, 10, 500, 900]),
+            "1": np.array([], dtype=np.int64),
+            "2": np.array([-2, -1, -1, 5, 520, 1000]),
+            "3": np.array([300, 700, -2, -1, 100, 650]),
+        }
+        for delta_window in (0, 1, 30, 1e3):
+            self.assert_same_as_loop(data, delta_window)
+
+
+if __name__ == "__main__":
+    unittest.main()
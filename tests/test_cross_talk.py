@@ -1,6 +1,4 @@
 import os
-import shutil
-import unittest
 
 import numpy as np
 
@@ -11,32 +9,31 @@ from daplis.functions.cross_talk import (
     zero_to_cross_talk_collect,
     zero_to_cross_talk_plot,
 )
+from tests import base
 
 
-class TestCrossTalkFunctions(unittest.TestCase):
-    def setUp(self):
+class TestCrossTalkFunctions(base.TestDataFolderCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
         # Set up test variables
-        self.partial_path = "tests/test_data"
-        self.pixels = (70,)
-        self.daughterboard_number = "NL11"
-        self.motherboard_number = "#33"
-        self.firmware_version = "2212s"
-        self.timestamps = 300
-        self.delta_window = 20e3
-        self.rewrite = True
-        self.range_left = -20e3
-        self.range_right = 20e3
-        self.same_y = False
-        self.app_mask = True
-        self.include_offset = False
+        cls.pixels = (70,)
+        cls.daughterboard_number = "NL11"
+        cls.motherboard_number = "#33"
+        cls.firmware_version = "2212s"
+        cls.timestamps = 300
+        cls.delta_window = 20e3
+        cls.rewrite = True
+        cls.range_left = -20e3
+        cls.range_right = 20e3
+        cls.same_y = False
+        cls.app_mask = True
+        cls.include_offset = False
 
     def test_collect_dcr_by_file_positive(self):
         # Test positive case for deltas_save function
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
         collect_dcr_by_file(
-            path,
+            self.path,
             self.daughterboard_number,
             self.motherboard_number,
             self.firmware_version,
@@ -47,41 +44,33 @@ class TestCrossTalkFunctions(unittest.TestCase):
         self.assertTrue(
             os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "dcr_data/test_data_2212b-test_data_2212b_dcr_data.pkl",
                 )
             )
         )
 
     def test_plot_dcr_histogram_and_stability(self):
-
         # Test positive case for deltas_save function
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         plot_dcr_histogram_and_stability(
-            path,
+            self.path,
         )
 
         self.assertTrue(
             os.path.isfile(
-                os.path.join(path, "results/dcr/DCR_stability_graph.png")
+                os.path.join(self.path, "results/dcr/DCR_stability_graph.png")
             )
             and os.path.isfile(
-                os.path.join(path, "results/dcr/DCR_histogram_w_integral.png")
+                os.path.join(
+                    self.path, "results/dcr/DCR_histogram_w_integral.png"
+                )
             )
         )
 
     def test_zero_to_cross_talk_collect(self):
-
         # Test positive case for deltas_save function
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         zero_to_cross_talk_collect(
-            path,
+            self.path,
             self.pixels,
             self.rewrite,
             self.daughterboard_number,
@@ -94,14 +83,14 @@ class TestCrossTalkFunctions(unittest.TestCase):
         self.assertTrue(
             os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "cross_talk_data/test_data_2212b-test_"
                     "data_2212b_pixels_70-50.feather",
                 )
             )
             and os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "cross_talk_data/test_data_2212b-test_"
                     "data_2212b_pixels_70-90.feather",
                 )
@@ -109,14 +98,9 @@ class TestCrossTalkFunctions(unittest.TestCase):
         )
 
     def test_zero_to_cross_talk_plot(self):
-
         # Test positive case for deltas_save function
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         zero_to_cross_talk_plot(
-            path,
+            self.path,
             self.pixels,
         )
 
@@ -124,7 +108,7 @@ class TestCrossTalkFunctions(unittest.TestCase):
         self.assertTrue(
             os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "ct_vs_distance/Average_cross-talk.png",
                 )
             )
@@ -132,19 +116,10 @@ class TestCrossTalkFunctions(unittest.TestCase):
 
     def test_zero_to_cross_talk_unpickle(self):
         # Test that unpickle_cross_talk returns valid arrays
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-        path = os.path.join(work_dir, self.partial_path)
-        pkl_file = os.path.join(path, "ct_vs_distance/Average_cross-talk.pkl")
+        pkl_file = os.path.join(
+            self.path, "ct_vs_distance/Average_cross-talk.pkl"
+        )
         x, y, yerr = unpickle_cross_talk(pkl_file)
         self.assertIsNotNone(x)
         self.assertIsNotNone(y)
         self.assertIsNotNone(yerr)
-
-    def tearDownClass():
-        # Clean up after tests
-        os.chdir(r"{}".format(os.path.dirname(os.path.realpath(__file__))))
-        shutil.rmtree("test_data/dcr_data")
-        shutil.rmtree("test_data/results")
-        shutil.rmtree("test_data/cross_talk_data")
-        shutil.rmtree("test_data/ct_vs_distance")
-        shutil.rmtree("test_data/senpop_data")
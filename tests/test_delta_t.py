@@ -1,5 +1,4 @@
 import os
-import shutil
 import unittest
 
 import numpy as np
@@ -16,38 +15,39 @@ from daplis.functions.fits import (
     fit_with_gaussian_fancy,
     unpickle_fit,
 )
+from tests import base
 
 
-class TestDeltasFull(unittest.TestCase):
-    def setUp(self):
+class TestDeltasFull(base.TestDataFolderCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
         # Set up test variables
-        self.partial_path = "tests/test_data"
+        cls.daughterboard_number = "NL11"
+        cls.motherboard_number = "#33"
+        cls.firmware_version = "2212b"
+        cls.timestamps = 300
+        cls.delta_window = 20e3
+        cls.rewrite = True
+        cls.range_left = -20e3
+        cls.range_right = 20e3
+        cls.same_y = False
+        cls.cycle_length = 4e9
+        cls.apply_mask = True
+        cls.include_offset = False
+
+    def setUp(self):
+        # The pixel lists are modified in place when the hot pixels are
+        # masked, so they are set up anew for each test
         self.pixels = [
             [x for x in range(66, 70)],
             [x for x in range(170, 178)],
         ]
-        self.daughterboard_number = "NL11"
-        self.motherboard_number = "#33"
-        self.firmware_version = "2212b"
-        self.timestamps = 300
-        self.delta_window = 20e3
-        self.rewrite = True
-        self.range_left = -20e3
-        self.range_right = 20e3
-        self.same_y = False
-        self.cycle_length = 4e9
-        self.apply_mask = True
-        self.include_offset = False
 
     def test_a_deltas_save_positive(self):
         # Test positive case for deltas_save function
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        # os.chdir(work_dir)
-
-        path = os.path.join(work_dir, self.partial_path)
         calculate_and_save_timestamp_differences(
-            path,
+            self.path,
             self.pixels,
             self.rewrite,
             self.daughterboard_number,
@@ -60,31 +60,23 @@ class TestDeltasFull(unittest.TestCase):
             self.include_offset,
         )
 
-        os.chdir(
-            os.path.join(
-                os.path.dirname(os.path.realpath(__file__)), "test_data"
-            )
-        )
-
         # Check if the csv file is created
         self.assertTrue(
             os.path.isfile(
-                "delta_ts_data/test_data_2212b-test_data_2212b.feather"
+                os.path.join(
+                    self.path,
+                    "delta_ts_data/test_data_2212b-test_data_2212b.feather",
+                )
             )
         )
 
     # Negative test case
     # Invalid firmware version
     def test_b_deltas_save_negative(self):
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        # os.chdir(work_dir)
-        path = os.path.join(work_dir, self.partial_path)
-
         # Test negative case for deltas_save function
         with self.assertRaises(TypeError):
             calculate_and_save_timestamp_differences(
-                path,
+                self.path,
                 self.pixels,
                 "2212",
                 self.daughterboard_number,
@@ -97,13 +89,8 @@ class TestDeltasFull(unittest.TestCase):
     def test_c_delta_cp(self):
         # Test case for delta_cp function
         # Positive test case
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        # os.chdir(work_dir)
-        path = os.path.join(work_dir, self.partial_path)
-
         collect_and_plot_timestamp_differences(
-            path,
+            self.path,
             pixels=[x for x in range(67, 69)] + [x for x in range(173, 175)],
             rewrite=self.rewrite,
             range_left=self.range_left,
@@ -115,7 +102,7 @@ class TestDeltasFull(unittest.TestCase):
         self.assertTrue(
             os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "results/delta_t/test_data_2212b-test_data_2212b_delta_t_grid.png",
                 )
             )
@@ -123,12 +110,8 @@ class TestDeltasFull(unittest.TestCase):
 
     def test_c_delta_cp_pickle(self):
         # Test that collect_and_plot produces a pickle file when requested
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         collect_and_plot_timestamp_differences(
-            path,
+            self.path,
             pixels=[x for x in range(67, 69)] + [x for x in range(173, 175)],
             rewrite=self.rewrite,
             range_left=self.range_left,
@@ -140,7 +123,7 @@ class TestDeltasFull(unittest.TestCase):
         self.assertTrue(
             os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "results/delta_t/test_data_2212b-test_data_2212b_delta_t_grid.pkl",
                 )
             )
@@ -148,9 +131,6 @@ class TestDeltasFull(unittest.TestCase):
 
     def test_d_fit_with_gaussian_positive(self):
         # Test with valid input
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
         pixels = [67, 174]
         range_left = -5e3
         range_right = 5e3
@@ -158,7 +138,7 @@ class TestDeltasFull(unittest.TestCase):
 
         # Call the function
         fit_with_gaussian(
-            path,
+            self.path,
             pixels,
             ft_file=None,
             range_left=range_left,
@@ -170,7 +150,7 @@ class TestDeltasFull(unittest.TestCase):
         self.assertTrue(
             os.path.isfile(
                 os.path.join(
-                    path,
+                    self.path,
                     "results/fits/test_data_2212b-test_data_2212b_"
                     f"pixels_{pixels[0]},{pixels[1]}_fit.png",
                 )
@@ -181,14 +161,10 @@ class TestDeltasFull(unittest.TestCase):
         # Test with valid input
         pixels = [82, 116]
 
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         ft_file = r"test.feather"
 
         fit_with_gaussian_combine(
-            path,
+            self.path,
             pixels=pixels,
             ft_file=ft_file,
             range_left=-10e3,
@@ -204,14 +180,10 @@ class TestDeltasFull(unittest.TestCase):
         # Test with valid input
         pixels = [82, 116]
 
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         ft_file = r"test.feather"
 
         fit_with_gaussian_combine(
-            path,
+            self.path,
             pixels=pixels,
             ft_file=ft_file,
             range_left=-10e3,
@@ -228,15 +200,11 @@ class TestDeltasFull(unittest.TestCase):
         # Test with valid input
         pixels = [82, 116]
 
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         ft_file = r"test.feather"
 
         # Call the function
         fit_with_gaussian_all(
-            path,
+            self.path,
             pixels=pixels,
             ft_file=ft_file,
             range_left=-10e3,
@@ -255,15 +223,11 @@ class TestDeltasFull(unittest.TestCase):
         # Test with valid input
         pixels = [82, 116]
 
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         ft_file = r"test.feather"
 
         # Call the function
         fit_with_gaussian_fancy(
-            path,
+            self.path,
             pixels=pixels,
             ft_file=ft_file,
             range_left=-5e3,
@@ -280,9 +244,6 @@ class TestDeltasFull(unittest.TestCase):
 
     def test_d_fit_with_gaussian_pickle_positive(self):
         # Test with valid input
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
         pixels = [67, 174]
         range_left = -15e3
         range_right = 15e3
@@ -290,7 +251,7 @@ class TestDeltasFull(unittest.TestCase):
 
         # Call the function
         fit_with_gaussian(
-            path,
+            self.path,
             pixels,
             ft_file=None,
             range_left=range_left,
@@ -306,20 +267,22 @@ class TestDeltasFull(unittest.TestCase):
                 f"pixels_{pixels[0]},{pixels[1]}_fit.pkl"
             )
         )
+        self.assertTrue(
+            os.path.isfile(
+                "results/fits/test_data_2212b-test_data_2212b_"
+                f"pixels_{pixels[0]},{pixels[1]}_fit.npz"
+            )
+        )
 
     def test_d_fit_with_gaussian_all_pickle_positive(self):
         # Test with valid input
         pixels = [82, 116]
 
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         ft_file = r"test.feather"
 
         # Call the function
         fit_with_gaussian_all(
-            path,
+            self.path,
             pixels=pixels,
             ft_file=ft_file,
             range_left=-10e3,
@@ -339,15 +302,11 @@ class TestDeltasFull(unittest.TestCase):
         # Test with valid input
         pixels = [82, 116]
 
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-
-        path = os.path.join(work_dir, self.partial_path)
-
         ft_file = r"test.feather"
 
         # Call the function
         fit_with_gaussian_fancy(
-            path,
+            self.path,
             pixels=pixels,
             ft_file=ft_file,
             range_left=-5e3,
@@ -365,10 +324,8 @@ class TestDeltasFull(unittest.TestCase):
 
     def test_e_unpickle_delta_t_plot(self):
         # Test that unpickle_plot returns valid figure and data
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-        path = os.path.join(work_dir, self.partial_path)
         pkl_file = os.path.join(
-            path,
+            self.path,
             "results/delta_t/test_data_2212b-test_data_2212b_delta_t_grid.pkl",
         )
         result = unpickle_plot(pkl_file)
@@ -376,22 +333,14 @@ class TestDeltasFull(unittest.TestCase):
 
     def test_e_unpickle_fit(self):
         # Test that unpickle_fit returns valid figure, data and params
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
-        path = os.path.join(work_dir, self.partial_path)
         pkl_file = os.path.join(
-            path,
+            self.path,
             "results/fits/test_data_2212b-test_data_2212b_pixels_67,174_fit.pkl",
         )
         fig, plot_data, params_df = unpickle_fit(pkl_file)
         self.assertIsNotNone(fig)
         self.assertIsInstance(plot_data, dict)
 
-    def tearDownClass():
-        # Clean up after tests
-        os.chdir(r"{}".format(os.path.dirname(os.path.realpath(__file__))))
-        shutil.rmtree("test_data/delta_ts_data")
-        shutil.rmtree("test_data/results")
-
 
 if __name__ == "__main__":
     unittest.main()
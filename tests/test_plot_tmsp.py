@@ -1,22 +1,30 @@
 import os
-import shutil
 import unittest
 
+import numpy as np
+
 from daplis.functions.sensor_plot import (
+    _count_raw_timestamps,
+    _get_pixel_layout,
+    _unpack_and_count,
     plot_sensor_population,
     plot_single_pix_hist,
     unpickle_plot,
 )
+from daplis.functions.unpack import unpack_binary_data
+from tests import base
 
 
-class TestPlotScripts(unittest.TestCase):
-    def setUp(self):
-        self.path = "tests/test_data"
-        self.pix = 15
-        self.daughterboard_number = "NL11"
-        self.motherboard_number = "#33"
-        self.firmware_version = "2212b"
-        self.timestamps = 300
+class TestPlotScripts(base.TestDataFolderCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Set up test variables
+        cls.pix = 15
+        cls.daughterboard_number = "NL11"
+        cls.motherboard_number = "#33"
+        cls.firmware_version = "2212b"
+        cls.timestamps = 300
 
     def test_a_plot_pixel_hist(self):
         # Positive test case
@@ -34,7 +42,11 @@ class TestPlotScripts(unittest.TestCase):
         )
         self.assertTrue(
             os.path.exists(
-                "results/single pixel histograms/test_data_2212b.dat, pixel 15.png"
+                os.path.join(
+                    self.path,
+                    "results/single pixel histograms/"
+                    "test_data_2212b.dat, pixel 15.png",
+                )
             )
         )
 
@@ -52,7 +64,11 @@ class TestPlotScripts(unittest.TestCase):
         )
         self.assertTrue(
             os.path.isfile(
-                "results/sensor_population/test_data_2212b-test_data_2212b_rates.png"
+                os.path.join(
+                    self.path,
+                    "results/sensor_population/"
+                    "test_data_2212b-test_data_2212b_rates.png",
+                )
             )
         )
 
@@ -71,25 +87,113 @@ class TestPlotScripts(unittest.TestCase):
         )
         self.assertTrue(
             os.path.isfile(
-                "results/sensor_population/test_data_2212b-test_data_2212b_rates.pickle"
+                os.path.join(
+                    self.path,
+                    "results/sensor_population/"
+                    "test_data_2212b-test_data_2212b_rates.pickle",
+                )
             )
         )
 
     def test_d_unpickle_sensor_plot(self):
         # Test that unpickle_plot returns valid figure and data
-        work_dir = os.path.dirname(os.path.realpath(__file__)) + "/.."
         pkl_file = os.path.join(
-            work_dir,
             self.path,
             "results/sensor_population/test_data_2212b-test_data_2212b_rates.pickle",
         )
         result = unpickle_plot(pkl_file)
         self.assertIsNotNone(result)
 
-    def tearDownClass():
-        # Clean up after tests
-        os.chdir(r"{}".format(os.path.dirname(os.path.realpath(__file__))))
-        shutil.rmtree("test_data/results")
+
+class TestCountRawTimestamps(base.TestDataFolderCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Set up test variables
+        cls.file = os.path.join(cls.path, "test_data_2212b.dat")
+        cls.daughterboard_number = "NL11"
+        cls.motherboard_number = "#33"
+        cls.timestamps = 300
+
+    def test_counts_match_unpacked_data(self):
+        # Counting straight from the binary words should give the same
+        # numbers as counting the unpacked data
+        for firmware_version in ("2212b", "2212s"):
+            layout = _get_pixel_layout(firmware_version)
+            counts, max_timestamp, number_of_timestamps = (
+                _count_raw_timestamps(self.file, self.timestamps, layout)
+            )
+
+            data_pixels, data_timestamps = unpack_binary_data(
+                self.file,
+                self.daughterboard_number,
+                self.motherboard_number,
+                firmware_version,
+                self.timestamps,
+            )
+            valid = data_timestamps >= 0
+            tdcs = np.broadcast_to(np.arange(64)[:, None], data_pixels.shape)
+            expected_counts = np.bincount(
+                layout["coord"][tdcs[valid], data_pixels[valid]],
+                minlength=256,
+            )
+
+            np.testing.assert_array_equal(counts, expected_counts)
+            self.assertEqual(max_timestamp, data_timestamps.max())
+            self.assertEqual(number_of_timestamps, data_timestamps.size)
+
+    def test_absolute_timestamps(self):
+        # The same data with two words of absolute timestamps at the
+        # start of each cycle should give the same counts
+        raw_data = np.fromfile(self.file, dtype=np.uint32).reshape(
+            -1, 65 * self.timestamps
+        )
+        absolute_timestamps = np.tile(
+            np.array([0x80000005, 0x80000001], dtype=np.uint32),
+            (len(raw_data), 1),
+        )
+        file = os.path.join(self.path, "test_data_2212b_absolute.dat")
+        np.hstack([absolute_timestamps, raw_data]).tofile(file)
+
+        for firmware_version in ("2212b", "2212s"):
+            layout = _get_pixel_layout(firmware_version)
+            results = [
+                _unpack_and_count(
+                    data_file,
+                    self.daughterboard_number,
+                    self.motherboard_number,
+                    firmware_version,
+                    self.timestamps,
+                    layout,
+                    absolute_timestamps=with_absolute,
+                )
+                for data_file, with_absolute in (
+                    (self.file, False),
+                    (file, True),
+                )
+            ]
+
+            np.testing.assert_array_equal(results[1][0], results[0][0])
+            self.assertEqual(results[1][1:], results[0][1:])
+
+    def test_partial_cycle(self):
+        # A file that ends with a partial cycle is rejected, as when
+        # unpacking it
+        file = os.path.join(self.path, "test_data_2212b_partial.dat")
+        with open(self.file, "rb") as f_in, open(file, "wb") as f_out:
+            f_out.write(f_in.read()[:-4])
+
+        layout = _get_pixel_layout("2212b")
+        with self.assertRaises(ValueError):
+            _count_raw_timestamps(file, self.timestamps, layout)
+        with self.assertRaises(ValueError):
+            unpack_binary_data(
+                file,
+                self.daughterboard_number,
+                self.motherboard_number,
+                "2212b",
+                self.timestamps,
+            )
 
 
 if __name__ == "__main__":
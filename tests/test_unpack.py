@@ -30,7 +30,7 @@ class TestUnpackBin(unittest.TestCase):
         # Assert the shape of the output data
         self.assertEqual(data_timestamps.shape, (64, 300 * 300))
         # Assert the data type of the output data
-        self.assertEqual(data_timestamps.dtype, np.longlong)
+        self.assertEqual(data_timestamps.dtype, np.int32)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,61 @@
+import unittest
+import warnings
+
+import numpy as np
+
+from daplis.functions.utils import fit_gaussian, fit_gaussians, gaussian
+
+
+class TestFitGaussians(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Synthetic Poisson peaks on a flat background, one per row
+        rng = np.random.default_rng(0)
+        cls.n_peaks = 20
+        cls.x = np.tile(np.arange(-200, 201, 10, dtype=float), (20, 1))
+        cls.params = np.column_stack(
+            [
+                rng.uniform(50, 500, cls.n_peaks),
+                rng.uniform(-50, 50, cls.n_peaks),
+                rng.uniform(20, 40, cls.n_peaks),
+                rng.uniform(5, 30, cls.n_peaks),
+            ]
+        )
+        cls.y = rng.poisson(gaussian(cls.x, *cls.params.T[..., None])).astype(
+            float
+        )
+        cls.flat_noise = rng.poisson(10, cls.x.shape[1]).astype(float)
+
+    def test_residuals_compared_to_fit_gaussian(self):
+        # The batched fit should be as good as fitting each peak
+        # separately
+        fit_params = fit_gaussians(self.x, self.y)
+
+        self.assertEqual(fit_params.shape, (self.n_peaks, 4))
+        self.assertFalse(np.isnan(fit_params).any())
+        for x, y, params in zip(self.x, self.y, fit_params):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                params_single, _ = fit_gaussian(x, y)
+            residuals = np.sum((gaussian(x, *params) - y) ** 2)
+            residuals_single = np.sum((gaussian(x, *params_single) - y) ** 2)
+            self.assertLessEqual(residuals, residuals_single * (1 + 1e-6))
+
+    def test_flat_windows_are_nan(self):
+        # Windows without a peak should come back as NaN rows without
+        # affecting the fits of the other rows
+        fit_params = fit_gaussians(self.x, self.y)
+        for flat_row in (self.flat_noise, np.full(self.x.shape[1], 10.0)):
+            y = self.y.copy()
+            y[3] = flat_row
+            fit_params_flat = fit_gaussians(self.x, y)
+
+            self.assertTrue(np.isnan(fit_params_flat[3]).all())
+            others = np.arange(self.n_peaks) != 3
+            np.testing.assert_allclose(
+                fit_params_flat[others], fit_params[others], rtol=1e-3
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()